@@ -0,0 +1,110 @@
+# services/client/benchmarks/bench_league_table.py
+# time make_league_table against the previous implementation that rescanned the matches for every team
+#
+# usage (from services/client): python benchmarks/bench_league_table.py [teams ...]
+# every team plays 30 matchweeks (a double round-robin for small leagues), three quarters are played
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from project.api.client import make_league_table  # noqa: E402 (imported after the path is set up)
+
+
+def scoreGoals(team_id, matches):
+    """The previous implementation: one scan over all matches per team"""
+    info = {'name': team_id, 'played': 0, 'win': 0, 'loss': 0, 'tie': 0, 'DV': 0, 'DT': 0, 'PT': 0, 'sheet': 0}
+    for match in matches:
+        if match['goalshome'] is None or match['goalsaway'] is None:
+            continue
+        if match['hometeam'] == team_id:
+            info['played'] += 1
+            info['DV'] += match['goalshome']
+            info['DT'] += match['goalsaway']
+            if match['goalsaway'] == 0:
+                info['sheet'] += 1
+            if match['goalshome'] > match['goalsaway']:
+                info['PT'] += 3
+                info['win'] += 1
+            elif match['goalshome'] == match['goalsaway']:
+                info['PT'] += 1
+                info['tie'] += 1
+            else:
+                info['loss'] += 1
+        elif match['awayteam'] == team_id:
+            info['played'] += 1
+            info['DV'] += match['goalsaway']
+            info['DT'] += match['goalshome']
+            if match['goalshome'] == 0:
+                info['sheet'] += 1
+            if match['goalshome'] < match['goalsaway']:
+                info['PT'] += 3
+                info['win'] += 1
+            elif match['goalshome'] == match['goalsaway']:
+                info['PT'] += 1
+                info['tie'] += 1
+            else:
+                info['loss'] += 1
+    return info
+
+
+def make_league_table_rescan(matches_division):
+    """The previous make_league_table, teams_checked is a list"""
+    teams_checked = []
+    ranking = []
+    for match in matches_division:
+        team_id = match['hometeam']
+        if team_id not in teams_checked:
+            ranking.append(scoreGoals(team_id, matches_division))
+            teams_checked.append(team_id)
+        else:
+            team_id = match['awayteam']
+            if team_id not in teams_checked:
+                ranking.append(scoreGoals(team_id, matches_division))
+                teams_checked.append(team_id)
+    ranking.sort(key=lambda rank: rank['PT'], reverse=True)
+    return ranking
+
+
+def season(teams, matchweeks=30, seed=0):
+    """Matches in the format of GET /matches, random pairings every matchweek"""
+    rng = random.Random(seed)
+    matches = []
+    for matchweek in range(1, min(matchweeks, 2 * (teams - 1)) + 1):
+        order = list(range(1, teams + 1))
+        rng.shuffle(order)
+        for home, away in zip(order[::2], order[1::2]):
+            played = rng.random() < 0.75
+            matches.append({'matchweek': matchweek, 'hometeam': home, 'awayteam': away,
+                            'goalshome': rng.randrange(5) if played else None,
+                            'goalsaway': rng.randrange(4) if played else None})
+    return matches
+
+
+def best_of(function, matches, repeat):
+    timings = []
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        result = function(matches)
+        timings.append(time.perf_counter() - begin)
+    return min(timings), result
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or [20, 200, 2000]
+    print(f'{"teams":>6} {"matches":>8} {"rescan":>10} {"one pass":>10} {"speedup":>8}')
+    for teams in sizes:
+        matches = season(teams)
+        rescan, old = best_of(make_league_table_rescan, matches, 1 if teams > 500 else 3)
+        one_pass, new = best_of(make_league_table, matches, 3)
+        # the old builder skipped some away teams, every team it did rank must have the same row
+        rows = {entry['name']: entry for entry in new}
+        assert all(rows[entry['name']] == entry for entry in old)
+        print(f'{teams:>6} {len(matches):>8} {rescan:>9.4f}s {one_pass:>9.4f}s {rescan / one_pass:>7.0f}x')
+
+
+if __name__ == '__main__':
+    main()
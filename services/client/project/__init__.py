@@ -29,6 +29,10 @@ def create_app(script_info=None):
 	from project.api.client import client_blueprint
 	app.register_blueprint(client_blueprint)
 
+	# pool metrics on /metrics
+	from project.api.metrics import init_metrics
+	init_metrics(app)
+
 	# shell context for flask cli
 	@app.shell_context_processor
 	def ctx():
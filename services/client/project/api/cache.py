@@ -0,0 +1,101 @@
+# services/client/project/api/cache.py
+# bounded LRU caches with a time to live for the lookups of teams, clubs and the reference tables
+
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+
+class TTLCache:
+    """LRU cache of at most maxsize entries that expire ttl seconds after they were stored, thread safe"""
+
+    def __init__(self, maxsize, ttl, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires, value), least recently used first
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self.clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key=None):
+        """Drop one key, or every entry without a key"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+CACHES = ('teams', 'clubs', 'reference')
+_caches = {}
+_caches_lock = threading.Lock()
+_missing = object()
+
+
+def get_cache(name):
+    """Cache of a kind of lookup, shared by the requests of this process"""
+    cache = _caches.get(name)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(name)
+            if cache is None:
+                cache = _caches[name] = TTLCache(current_app.config['LOOKUP_CACHE_SIZE'],
+                                                 current_app.config['LOOKUP_CACHE_TTL'])
+    return cache
+
+
+def cached(name, key, load):
+    """Value of key in the cache name, load() fills it on a miss, failed loads are not cached"""
+    cache = get_cache(name)
+    value = cache.get(key, _missing)
+    if value is _missing:
+        value = load()
+        cache.set(key, value)
+    return value
+
+
+def invalidate(*names):
+    """Called by the admin routes after a successful write, the next lookups go to the services again"""
+    for name in names:
+        get_cache(name).invalidate()
+
+
+def cache_metrics():
+    """Hit, miss and eviction counters and the sizes of the caches in the prometheus text format"""
+    lines = []
+    for metric, kind, description in (('hits_total', 'counter', 'Lookups answered from the cache.'),
+                                      ('misses_total', 'counter', 'Lookups that went to the service.'),
+                                      ('evictions_total', 'counter', 'Entries dropped to stay under the size.'),
+                                      ('size', 'gauge', 'Entries in the cache.')):
+        name = f'lookup_cache_{metric}'
+        lines.append(f'# HELP {name} {description}\n# TYPE {name} {kind}\n')
+        for cache_name in CACHES:
+            cache = get_cache(cache_name)
+            value = len(cache) if metric == 'size' else getattr(cache, metric[:-len('_total')])
+            lines.append(f'{name}{{cache="{cache_name}"}} {value}\n')
+    return ''.join(lines)
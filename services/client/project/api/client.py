@@ -1,15 +1,15 @@
 # services/client/project/api/client.py
 # front end of the site
-import requests
 import datetime
-from math import inf
 import json
 
-from flask import Blueprint, jsonify, request, render_template, redirect, url_for, make_response
+from flask import Blueprint, g, jsonify, request, render_template, redirect, url_for, make_response
 from sqlalchemy import exc
 from sqlalchemy.sql import func
 
 from project import db, create_app, jwt
+from project.api import upstream
+from project.api.cache import cached, get_cache, invalidate
 
 from flask_jwt_extended import (
     jwt_required, create_access_token,
@@ -45,7 +45,7 @@ def login():
     password = request.form.get('password')
 
     # check if user exists
-    response = requests.get("http://users:5000/users")
+    response = upstream.get("http://users:5000/users")
     data = response.json()['data']['users']
 
     found = False
@@ -100,7 +100,7 @@ def logout():
 @client_blueprint.route('/competition/clubs', methods=['GET'])
 def get_all_clubs():
     # get list of clubs info and pass this to html template
-    response = requests.get("http://teams:5000/clubs")
+    response = upstream.get("http://teams:5000/clubs")
     data = response.json()['data']['clubs']
 
     user = get_identity_if_login()
@@ -112,12 +112,11 @@ def get_all_clubs():
 
 @client_blueprint.route('/competition/clubs/<stamnumber>', methods=['GET'])
 def get_club(stamnumber):
-    # get list of clubs info and pass this to html template
-    response = requests.get(f"http://teams:5000/clubs/{stamnumber}")
-    club = response.json()['data']
-
-    response = requests.get("http://teams:5000/teams")
-    teams = response.json()['data']['teams']
+    # get club info and the teams, both at once, and pass this to html template
+    club, teams_response = upstream.fan_out(
+        lambda: get_club_record(stamnumber),
+        lambda: upstream.get("http://teams:5000/teams"))
+    teams = teams_response.json()['data']['teams']
 
     user = get_identity_if_login()
     if user:
@@ -127,66 +126,37 @@ def get_club(stamnumber):
         return render_template('club.html', login=False, userclub=None, club=club, admin=False, teams=teams)
 
 
-def getLastGames(matches, amount=3):
-    to_return = []
-    list_copy = matches[:]
-    for i in range(amount):
-        val = min(list_copy,
-                  key=lambda s: datetime.datetime.strptime(s['date'], "%Y-%m-%d").date() - datetime.date.today())
-        to_return.append(val)
-        list_copy.remove(val)
-    return to_return
+def get_club_record(stamnumber):
+    """Club details, cached for LOOKUP_CACHE_TTL seconds"""
+    return cached('clubs', str(stamnumber),
+                  lambda: upstream.get(f"http://teams:5000/clubs/{stamnumber}").json()['data'])
 
 
-def create_win_loss_string(games, team):
-    string = ""
-    for game in games:
-        if game['goalshome'] > game['goalsaway']:
-            if team == game['hometeam']:
-                string += 'W'
-            else:
-                string += 'L'
-        elif game['goalshome'] == game['goalsaway']:
-            string += 'D'
-        else:
-            if team == game['hometeam']:
-                string += 'L'
-            else:
-                string += 'W'
-    return string
+def get_form(team_id, amount):
+    """Results (W/D/L) of the last played matches of a team, most recent first"""
+    response = upstream.get(f"http://matches:5000/teams/{team_id}/form", params={'n': amount})
+    return response.json()['data']['form']
 
 
 @client_blueprint.route('/competition/teams/<team_id>', methods=['GET'])
 def get_team(team_id):
-    # get team
-    response = requests.get(f"http://teams:5000/teams/{team_id}")
-    team = response.json()['data']
-
-    # get club with stamnumber of team
-    response = requests.get(f"http://teams:5000/clubs/{team['stamnumber']}")
-    club = response.json()['data']
+    def get_team_and_club():
+        # get team, then the club with stamnumber of team
+        team = cached('teams', ('record', str(team_id)),
+                      lambda: upstream.get(f"http://teams:5000/teams/{team_id}").json()['data'])
+        return team, get_club_record(team['stamnumber'])
+
+    # the upcoming matches and the form only need the id, so they are fetched at the same time
+    (team, club), response, string = upstream.fan_out(
+        get_team_and_club,
+        lambda: upstream.get("http://matches:5000/matches",
+                             params={'team': team_id, 'from': datetime.date.today().isoformat()}),
+        lambda: get_form(team_id, 3))
 
     # make fixture for upcoming matches
-    # get all matches
-    response = requests.get("http://matches:5000/matches")
-    matches = response.json()['data']['matches']
-
-    upcoming_matches = []
-    today = datetime.date.today()
-    for match in matches:
-        date = datetime.datetime.strptime(match['date'], '%Y-%m-%d').date()
-        if date >= today and (match['hometeam'] == team['id'] or match['awayteam'] == team['id']):
-            upcoming_matches.append(match)
+    upcoming_matches = response.json()['data']['matches']
     fixture = make_week_fixture(upcoming_matches)
 
-    team_matches = []
-    for match in matches:
-        if match['hometeam'] == team['id'] or match['awayteam'] == team['id']:
-            team_matches.append(match)
-
-    last_results = getLastGames(team_matches)
-    string = create_win_loss_string(last_results, team_id)
-
     user = get_identity_if_login()
     if user:
         return render_template('team.html', login=True, admin=user['admin'], userclub=user['club'], team=team,
@@ -202,8 +172,7 @@ def get_team(team_id):
 @client_blueprint.route('/competition/divisions', methods=['GET'])
 def get_divisions():
     # get divisions
-    response = requests.get("http://matches:5000/divisions")
-    divisions = response.json()['data']['divisions']
+    divisions = get_reference()['divisions']
 
     user = get_identity_if_login()
     if user:
@@ -213,90 +182,126 @@ def get_divisions():
         return render_template('divisions.html', login=False, userclub=None, admin=False, divisions=divisions)
 
 
-def getTeamName(team_id):
-    resp = requests.get(f"http://teams:5000/teams/{team_id}")
-    stamnumber = resp.json()['data']['stamnumber']
-    resp = requests.get(f"http://teams:5000/clubs/{stamnumber}")
-    return resp.json()['data']['name']
+def getTeamNames(team_ids):
+    """
+    Names of several teams resolved in one call to the teams service
+    :return: dict of team id -> {'name': display name, 'club': name of the club}
+    """
+    cache = get_cache('teams')
+    names = {}
+    missing = []
+    for team_id in sorted({int(team_id) for team_id in team_ids}):
+        team = cache.get(('name', team_id))
+        if team is None:
+            missing.append(team_id)
+        else:
+            names[team_id] = team
+    if missing:
+        # only the teams that are not cached yet
+        response = upstream.get("http://teams:5000/teams/names", params={'ids': ','.join(map(str, missing))})
+        for team in response.json()['data']['teams']:
+            cache.set(('name', team['id']), team)
+            names[team['id']] = team
+    return names
 
 
-def getStatus(status_id):
-    resp = requests.get(f"http://matches:5000/status/{status_id}")
-    return resp.json()['data']['statusname']
+def get_reference():
+    """
+    Lookup tables (divisions and status) of the matches service, cached for LOOKUP_CACHE_TTL seconds
+    :return: dict with the lists 'divisions' and 'status'
+    """
+    if 'reference' not in g:
+        g.reference = cached('reference', 'reference',
+                             lambda: upstream.get("http://matches:5000/reference").json()['data'])
+    return g.reference
 
 
-def scoreGoals(team_id, matches):
-    info = {'name': team_id, 'played': 0, 'win': 0, 'loss': 0, 'tie': 0, 'DV': 0, 'DT': 0, 'PT': 0, 'sheet': 0}
-    for match in matches:
-        if match['goalshome'] is None or match['goalsaway'] is None:
-            continue
-        if match['hometeam'] == team_id:
-            info['played'] += 1
-            info['DV'] += match['goalshome']
-            info['DT'] += match['goalsaway']
-            if info['DT'] == 0:
-                info['sheet'] += 1
-            if match['goalshome'] > match['goalsaway']:
-                info['PT'] += 3
-                info['win'] += 1
-            elif match['goalshome'] == match['goalsaway']:
-                info['PT'] += 1
-                info['tie'] += 1
-            else:
-                info['loss'] += 1
-        elif match['awayteam'] == team_id:
-            info['played'] += 1
-            info['DV'] += match['goalsaway']
-            info['DT'] += match['goalshome']
-            if info['DT'] == 0:
-                info['sheet'] += 1
-            if match['goalshome'] < match['goalsaway']:
-                info['PT'] += 3
-                info['win'] += 1
-            elif match['goalshome'] == match['goalsaway']:
-                info['PT'] += 1
-                info['tie'] += 1
-            else:
-                info['loss'] += 1
-    return info
+def getStatus(status_id):
+    for status in get_reference()['status']:
+        if status['id'] == status_id:
+            return status['statusname']
 
 
 def make_league_table(matches_division):
     """
-    Creates the league table for a certain division, helper function for route function below
+    Creates the league table for a certain division in one pass over the matches, helper function for route
+    function below
     :param matches_division: list of matches for a certain division
-    :return: ordered list that specifies league table, each entry is dict
+    :return: list of entries (dicts), sorted on points, then goal difference, then goals scored
     """
-    teams_checked = []  # list of teams checked
-    ranking = []
+    ranking = {}  # team id -> entry, in order of first appearance
     for match in matches_division:
-        team_id = match['hometeam']
-        if team_id not in teams_checked:
-            rank = scoreGoals(team_id, matches_division)
-            ranking.append(rank)
-            teams_checked.append(team_id)
-        else:
-            team_id = match['awayteam']
-            if team_id not in teams_checked:
-                rank = scoreGoals(team_id, matches_division)
-                ranking.append(rank)
-                teams_checked.append(team_id)
+        # every team gets a row, also when none of its matches has been played yet
+        for team_id in (match['hometeam'], match['awayteam']):
+            if team_id not in ranking:
+                ranking[team_id] = new_entry(team_id)
+        home, away = ranking[match['hometeam']], ranking[match['awayteam']]
+        goals_home, goals_away = match['goalshome'], match['goalsaway']
+        if goals_home is None or goals_away is None:
+            continue
+        for entry, goals_for, goals_against in ((home, goals_home, goals_away), (away, goals_away, goals_home)):
+            entry['played'] += 1
+            entry['DV'] += goals_for
+            entry['DT'] += goals_against
+            if goals_against == 0:
+                entry['sheet'] += 1
+            if goals_for > goals_against:
+                entry['PT'] += 3
+                entry['win'] += 1
+            elif goals_for == goals_against:
+                entry['PT'] += 1
+                entry['tie'] += 1
+            else:
+                entry['loss'] += 1
+
+    # sort ranking from high to low, teams that are level keep their order of appearance
+    return sorted(ranking.values(), key=lambda entry: (entry['PT'], entry['DV'] - entry['DT'], entry['DV']),
+                  reverse=True)
 
-    # sort ranking on score from high to low
-    ranking.sort(key=lambda rank: rank['PT'], reverse=True)
 
-    return ranking
+def new_entry(team_id):
+    """Empty league table entry of a team"""
+    return {'name': team_id, 'played': 0, 'win': 0, 'loss': 0, 'tie': 0, 'DV': 0, 'DT': 0, 'PT': 0, 'sheet': 0}
+
+
+def standing_to_entry(standing):
+    """
+    Converts a standing of the matches service into a league table entry
+    :param standing: dict as returned by /standings
+    :return: dict in the format of make_league_table
+    """
+    return {'name': standing['team'], 'played': standing['played'], 'win': standing['win'],
+            'loss': standing['loss'], 'tie': standing['tie'], 'DV': standing['goalsfor'],
+            'DT': standing['goalsagainst'], 'PT': standing['points'], 'sheet': standing['cleansheets']}
+
+
+def season_leaders(league_table):
+    """
+    Finds the teams with the best attack, best defense and most clean sheets in a league table
+    :param league_table: list of entries in the format of make_league_table
+    :return: dict in the format of /statistics, team ids or None
+    """
+    played = [entry for entry in league_table if entry['played'] > 0]
+    if not played:
+        return {'bestattack': None, 'bestdefense': None, 'mostcleansheets': None}
+    return {'bestattack': max(played, key=lambda entry: entry['DV'])['name'],
+            'bestdefense': min(played, key=lambda entry: entry['DT'])['name'],
+            'mostcleansheets': max(played, key=lambda entry: entry['sheet'])['name']}
 
 
 def make_week_fixture(matches):
+    # resolve the names of all teams of the fixture at once
+    names = getTeamNames(team_id for match in matches for team_id in (match['hometeam'], match['awayteam']))
     week = []
     for match in matches:
         info = {}
         info['matchweek'] = match['matchweek']
         info['date'] = match['date']
         info['time'] = match['time']
-        info['hometeam'] = getTeamName(match['hometeam'])
-        info['awayteam'] = getTeamName(match['awayteam'])
+        info['hometeam'] = names[match['hometeam']]['name']
+        info['awayteam'] = names[match['awayteam']]['name']
+        info['homeclub'] = names[match['hometeam']]['club']
+        info['awayclub'] = names[match['awayteam']]['club']
         info['status'] = getStatus(match['status']) if match['status'] is not None else ''
         info['referee'] = match['referee'] if match['referee'] is not None else ''
         info['result'] = str(match['goalshome']) + ' - ' + str(match['goalsaway']) if match['goalshome'] is not None or \
@@ -329,41 +334,37 @@ def get_fixture_for_division(division_id):
 
 @client_blueprint.route('/competition/divisions/<division_id>/<year0>-<year1>', methods=['GET'])
 def get_fixture_for_division_season(division_id, year0, year1):
-    # get all matches
-    response = requests.get("http://matches:5000/matches")
-    matches = response.json()['data']['matches']
-
-    # define season
-    begin_season = datetime.date(int(year0), 9, 1)
-    end_season = datetime.date(int(year1), 8, 31)
+    # get the matches, league table, statistics and clubs of the page at once
+    params = {'division': division_id, 'season': f'{year0}-{year1}'}
+    matches_response, standings_response, statistics_response, clubs_response = upstream.fan_out(
+        lambda: upstream.get("http://matches:5000/matches", params=params),
+        lambda: upstream.get("http://matches:5000/standings", params=params),
+        lambda: upstream.get("http://matches:5000/statistics", params=params),
+        lambda: upstream.get("http://teams:5000/clubs"))
+
+    # all matches of the division in this season
+    division_matches = matches_response.json()['data']['matches']
+
+    # league table, kept up to date by the matches service
+    if standings_response.status_code == 200:
+        league_table = [standing_to_entry(standing) for standing in standings_response.json()['data']['standings']]
+    else:
+        league_table = make_league_table(division_matches)
 
-    # make league table
-    division_matches = []
-    for match in matches:
-        date = datetime.datetime.strptime(match['date'], '%Y-%m-%d').date()
-        if match['division'] == int(division_id) and begin_season <= date <= end_season:
-            division_matches.append(match)
-    league_table = make_league_table(division_matches)
+    # list team with best attack, defense, most clean sheet
+    if statistics_response.status_code == 200:
+        leaders = statistics_response.json()['data']
+    else:
+        leaders = season_leaders(league_table)
+    entries = {entry['name']: entry for entry in league_table}
+    best_attack = entries.get(leaders['bestattack'])
+    best_defense = entries.get(leaders['bestdefense'])
+    cleanest_sheet = entries.get(leaders['mostcleansheets'])
 
     # convert team id into team name
-    # list team with best attack, defense, most clean sheet
-    best_attack = None
-    best_attack_points = 0
-    best_defense = None
-    best_defense_points = inf
-    cleanest_sheet = None
-    cleanest_sheet_points = 0
+    names = getTeamNames(entry['name'] for entry in league_table)
     for entry in league_table:
-        entry['name'] = getTeamName(entry['name'])
-        if entry['DV'] > best_attack_points:
-            best_attack_points = entry['DV']
-            best_attack = entry
-        if entry['DT'] < best_defense_points:
-            best_defense_points = entry['DT']
-            best_defense = entry
-        if entry['sheet'] > cleanest_sheet_points:
-            cleanest_sheet_points = entry['sheet']
-            cleanest_sheet = entry
+        entry['name'] = names[entry['name']]['name']
 
     # convert season to json for template
     year = {'begin': year0, 'end': year1}
@@ -373,8 +374,7 @@ def get_fixture_for_division_season(division_id, year0, year1):
     matchweek = request.args.get('matchweek', default=None, type=int)
 
     # filter on team
-    response = requests.get("http://teams:5000/clubs")
-    clubs = response.json()['data']['clubs']
+    clubs = clubs_response.json()['data']['clubs']
     team = request.args.get('team', default=None, type=str)
 
     # create fixture
@@ -392,7 +392,7 @@ def get_fixture_for_division_season(division_id, year0, year1):
         temp_fixture = []
         team.replace('+', ' ')
         for entry in fixture:
-            if entry['hometeam'] == team or entry['awayteam'] == team:
+            if entry['homeclub'] == team or entry['awayclub'] == team:
                 temp_fixture.append(entry)
         fixture = temp_fixture
 
@@ -416,7 +416,7 @@ def get_fixture_for_division_season(division_id, year0, year1):
 @client_blueprint.route('/competition/matches/<match_id>', methods=['GET'])
 def get_specific_fixture(match_id):
     # normal info
-    response = requests.get(f"http://matches:5000/matches/{match_id}")
+    response = upstream.get(f"http://matches:5000/matches/{match_id}")
     match = response.json()['data']
 
     # check if match is yet to be played
@@ -430,39 +430,15 @@ def get_specific_fixture(match_id):
     last_games = []
     ht_scores_string = ''
     at_scores_string = ''
+    # the calls below only need the match, they run at the same time
+    calls = {}
     if date > now:
         stats = True
         # match has not been played
-        response = requests.get("http://matches:5000/matches")
-        matches = response.json()['data']['matches']
-
-        historic_matches = []
-        for temp_match in matches:
-            if (temp_match['hometeam'] == match['hometeam'] or temp_match['hometeam'] == match['awayteam']) and (
-                    temp_match['awayteam'] == match['hometeam'] or temp_match['awayteam'] == match['awayteam']):
-                if temp_match['goalshome'] is None or temp_match['goalsaway'] is None:
-                    continue
-                historic_matches.append(temp_match)
-                times_played += 1
-                if temp_match['goalshome'] > temp_match['goalsaway']:
-                    if temp_match['hometeam'] == match['hometeam']:
-                        wins_hometeam += 1
-                    else:
-                        wins_awayteam += 1
-                elif temp_match['goalshome'] < temp_match['goalsaway']:
-                    if temp_match['awayteam'] == match['hometeam']:
-                        wins_hometeam += 1
-                    else:
-                        wins_awayteam += 1
-        last_games = getLastGames(historic_matches)
-        hometeam_matches = [i for i in matches if
-                            i['hometeam'] == match['hometeam'] or i['awayteam'] == match['hometeam']]
-        awayteam_matches = [i for i in matches if
-                            i['hometeam'] == match['awayteam'] or i['awayteam'] == match['awayteam']]
-        ht_last_games = getLastGames(hometeam_matches, 5)
-        at_last_games = getLastGames(awayteam_matches, 5)
-        ht_scores_string = create_win_loss_string(ht_last_games, match['hometeam'])
-        at_scores_string = create_win_loss_string(at_last_games, match['awayteam'])
+        calls['headtohead'] = lambda: upstream.get("http://matches:5000/matches/head-to-head",
+                                                   params={'a': match['hometeam'], 'b': match['awayteam'], 'n': 3})
+        calls['htform'] = lambda: get_form(match['hometeam'], 5)
+        calls['atform'] = lambda: get_form(match['awayteam'], 5)
 
     # check if match is in 7 days, if so include weather report
     week = None
@@ -470,16 +446,30 @@ def get_specific_fixture(match_id):
     if now <= date <= next_week:
         # get weather info from antwerpen
         delta = date - now
-        response = requests.get(
+        calls['weather'] = lambda: upstream.get(
             "https://api.openweathermap.org/data/2.5/onecall?lat=51.2194475&lon=4.4024643&exclude=current,minutely,hourly,alerts&units=metric&appid=0202a55647559a82e31a2b4711bfc638")
-        week = response.json()['daily'][delta.days]
+    results = dict(zip(calls, upstream.fan_out(*calls.values())))
+
+    if stats:
+        head_to_head = results['headtohead'].json()['data']
+        times_played = head_to_head['played']
+        wins_hometeam = head_to_head['winsa']
+        wins_awayteam = head_to_head['winsb']
+        last_games = head_to_head['lastgames']
+
+        ht_scores_string = results['htform']
+        at_scores_string = results['atform']
+
+    if 'weather' in results:
+        week = results['weather'].json()['daily'][delta.days]
 
-    # render template
-    match['hometeam'] = getTeamName(match['hometeam'])
-    match['awayteam'] = getTeamName(match['awayteam'])
+    # render template, the names of the teams of the match and of the last games in one call
+    names = getTeamNames(team_id for game in [match] + last_games for team_id in (game['hometeam'], game['awayteam']))
+    match['hometeam'] = names[match['hometeam']]['name']
+    match['awayteam'] = names[match['awayteam']]['name']
     for game in last_games:
-        game['hometeam'] = getTeamName(game['hometeam'])
-        game['awayteam'] = getTeamName(game['awayteam'])
+        game['hometeam'] = names[game['hometeam']]['name']
+        game['awayteam'] = names[game['awayteam']]['name']
 
     user = get_identity_if_login()
     if user:
@@ -503,7 +493,7 @@ def get_scores():
     club = user['club']
 
     # get all teams of club
-    response = requests.get(f'http://teams:5000/teams')
+    response = upstream.get(f'http://teams:5000/teams', params={'fields': 'id,stamnumber'})
     teams = response.json()['data']['teams']
 
     team_ids = []
@@ -511,19 +501,22 @@ def get_scores():
         if team['stamnumber'] == int(club):
             team_ids.append(team['id'])
 
-    response = requests.get("http://matches:5000/matches")
-    matches = response.json()['data']['matches']
-
     # user can edit all his home games
     to_show = []
-    for match in matches:
-        team_id = match['hometeam']
-        if team_id in team_ids:
-            to_show.append(match)
+    # one request per team, concurrently, instead of one after the other
+    responses = upstream.fan_out(*(lambda team_id=team_id: upstream.get("http://matches:5000/matches",
+                                                                        params={'team': team_id})
+                                   for team_id in team_ids))
+    for team_id, response in zip(team_ids, responses):
+        matches = response.json()['data']['matches']
+        for match in matches:
+            if match['hometeam'] == team_id:
+                to_show.append(match)
 
+    names = getTeamNames(team_id for game in to_show for team_id in (game['hometeam'], game['awayteam']))
     for game in to_show:
-        game['hometeam'] = getTeamName(game['hometeam'])
-        game['awayteam'] = getTeamName(game['awayteam'])
+        game['hometeam'] = names[game['hometeam']]['name']
+        game['awayteam'] = names[game['awayteam']]['name']
         game['status'] = getStatus(game['status']) if game['status'] is not None else ''
         game['referee'] = game['referee'] if game['referee'] is not None else ''
         game['result'] = str(game['goalshome']) + ' - ' + str(game['goalsaway']) if game['goalshome'] is not None or \
@@ -546,13 +539,13 @@ def score_form(match_id):
 def post_scores(match_id):
     score = request.form.get('score')
     score = score.split('-')
-    response = requests.get(f'http://matches:5000/matches/{match_id}')
+    response = upstream.get(f'http://matches:5000/matches/{match_id}')
     match = response.json()['data']
 
     match['goalshome'] = int(score[0])
     match['goalsaway'] = int(score[1])
 
-    response = requests.put(f'http://matches:5000/matches/{match_id}', data=match)
+    response = upstream.put(f'http://matches:5000/matches/{match_id}', data=match)
 
     user = get_identity_if_login()
     return render_template('successful_score_update.html', login=True, userclub=user['club'], admin=user['admin'])
@@ -570,7 +563,7 @@ def get_admin():
 @client_blueprint.route('/admin/matches', methods=['GET'])
 @jwt_required
 def matches_admin():
-    response = requests.get("http://matches:5000/matches")
+    response = upstream.get("http://matches:5000/matches")
     matches = response.json()['data']['matches']
 
     # # show clean representation of matches
@@ -589,30 +582,19 @@ def matches_admin():
 
 
 def teamToID(team_name):
-    response = requests.get(f'http://teams:5000/teams')
-    teams = response.json()['data']['teams']
-
-    response = requests.get(f'http://teams:5000/clubs')
-    clubs = response.json()['data']['clubs']
-
-    stamnumber = -1
-    for club in clubs:
-        if team_name == club['name']:
-            stamnumber = club['stamnumber']
-
-    for team in teams:
-        if stamnumber == team['stamnumber']:
-            return team['id']
+    # names of all teams, the display name (with suffix) is matched before the club name
+    teams = cached('teams', 'all', lambda: upstream.get("http://teams:5000/teams/names").json()['data']['teams'])
+    for key in ('name', 'club'):
+        for team in teams:
+            if team[key] == team_name:
+                return team['id']
 
 
 def statusToID(status_name):
     if status_name == '':
         return None
     else:
-        response = requests.get(f'http://matches:5000/status')
-        status = response.json()['data']['status']
-
-        for s in status:
+        for s in get_reference()['status']:
             if s['statusname'] == status_name:
                 return s['id']
 
@@ -620,13 +602,14 @@ def statusToID(status_name):
 @client_blueprint.route('/admin/matches/<match_id>', methods=['GET', 'POST'])
 @jwt_required
 def edit_match(match_id):
-    response = requests.get(f'http://matches:5000/matches/{match_id}')
+    response = upstream.get(f'http://matches:5000/matches/{match_id}')
     match = response.json()['data']
     user = get_identity_if_login()
     if request.method == 'GET':
 
-        match['hometeam'] = getTeamName(match['hometeam'])
-        match['awayteam'] = getTeamName(match['awayteam'])
+        names = getTeamNames([match['hometeam'], match['awayteam']])
+        match['hometeam'] = names[match['hometeam']]['name']
+        match['awayteam'] = names[match['awayteam']]['name']
         match['status'] = getStatus(match['status']) if match['status'] is not None else ''
 
         return render_template('admin_match.html', login=True, userclub=user['club'], admin=user['admin'], match=match,
@@ -641,7 +624,7 @@ def edit_match(match_id):
             match['awayteam'] = teamToID(request.form.get('uitploeg'))
             match['status'] = statusToID(request.form.get('status'))
 
-            response = requests.put(f'http://matches:5000/matches/{match_id}', data=match)
+            response = upstream.put(f'http://matches:5000/matches/{match_id}', data=match)
             return redirect('/admin/matches')
         except:
             return render_template('admin_match.html', login=True, userclub=user['club'], admin=user['admin'],
@@ -651,9 +634,9 @@ def edit_match(match_id):
 @client_blueprint.route('/admin/matches/<match_id>/referee', methods=['GET'])
 @jwt_required
 def assign_referee(match_id):
-    response = requests.get(f'http://matches:5000/matches/{match_id}')
+    response = upstream.get(f'http://matches:5000/matches/{match_id}')
     match = response.json()['data']
-    response = requests.get('http://matches:5000/referees')
+    response = upstream.get('http://matches:5000/referees')
     referees = response.json()['data']['referees']
     user = get_identity_if_login()
     name = request.args.get('referee', default=None, type=str)
@@ -672,7 +655,7 @@ def assign_referee(match_id):
 
             match['referee'] = id
 
-            response = requests.put(f'http://matches:5000/matches/{match_id}', data=match)
+            response = upstream.put(f'http://matches:5000/matches/{match_id}', data=match)
             message = response.json()['message']
 
             if message == 'Referee double booked':
@@ -688,7 +671,7 @@ def assign_referee(match_id):
 @client_blueprint.route('/admin/status', methods=['GET'])
 @jwt_required
 def status_admin():
-    response = requests.get('http://matches:5000/status')
+    response = upstream.get('http://matches:5000/status')
     status_list = response.json()['data']['status']
 
     user = get_identity_if_login()
@@ -706,10 +689,11 @@ def admin_add_status():
         status = request.form.get('status')
         obj = {'statusname': status}
 
-        response = requests.post('http://matches:5000/status', data=obj)
+        response = upstream.post('http://matches:5000/status', data=obj)
         status_code = response.json()['status']
 
         if status_code == 'success':
+            invalidate('reference')
             return redirect('/admin/status')
         else:
             return render_template('status_division_add.html', login=True, userclub=user['club'], admin=user['admin'],
@@ -718,14 +702,16 @@ def admin_add_status():
 @client_blueprint.route('/admin/status/<status_id>/delete', methods=['GET'])
 @jwt_required
 def admin_delete_status(status_id):
-    response = requests.delete(f'http://matches:5000/status/{status_id}')
+    response = upstream.delete(f'http://matches:5000/status/{status_id}')
+    if response.status_code == 200:
+        invalidate('reference')
     return redirect('/admin/status')
 
 @client_blueprint.route('/admin/status/<status_id>', methods=['GET', 'POST'])
 @jwt_required
 def admin_edit_status(status_id):
     user = get_identity_if_login()
-    response = requests.get(f'http://matches:5000/status/{status_id}')
+    response = upstream.get(f'http://matches:5000/status/{status_id}')
     status = response.json()['data']
     if request.method == "GET":
         return render_template('status_division_edit.html', login=True, userclub=user['club'], admin=user['admin'],
@@ -734,10 +720,11 @@ def admin_edit_status(status_id):
         status = request.form.get('status')
         obj = {'statusname': status}
 
-        response = requests.put(f'http://matches:5000/status/{status_id}', data=obj)
+        response = upstream.put(f'http://matches:5000/status/{status_id}', data=obj)
         status_code = response.json()['status']
 
         if status_code == 'success':
+            invalidate('reference')
             return redirect('/admin/status')
         else:
             return render_template('status_division_edit.html', login=True, userclub=user['club'], admin=user['admin'],
@@ -746,7 +733,7 @@ def admin_edit_status(status_id):
 @client_blueprint.route('/admin/divisions', methods=['GET'])
 @jwt_required
 def division_admin():
-    response = requests.get('http://matches:5000/divisions')
+    response = upstream.get('http://matches:5000/divisions')
     division_list = response.json()['data']['divisions']
 
     user = get_identity_if_login()
@@ -764,10 +751,11 @@ def admin_add_division():
         division = request.form.get('division')
         obj = {'divisionname': division}
 
-        response = requests.post('http://matches:5000/divisions', data=obj)
+        response = upstream.post('http://matches:5000/divisions', data=obj)
         status_code = response.json()['status']
 
         if status_code == 'success':
+            invalidate('reference')
             return redirect('/admin/divisions')
         else:
             return render_template('status_division_add.html', login=True, userclub=user['club'], admin=user['admin'],
@@ -776,14 +764,16 @@ def admin_add_division():
 @client_blueprint.route('/admin/divisions/<division_id>/delete', methods=['GET'])
 @jwt_required
 def admin_delete_division(division_id):
-    response = requests.delete(f'http://matches:5000/divisions/{division_id}')
+    response = upstream.delete(f'http://matches:5000/divisions/{division_id}')
+    if response.status_code == 200:
+        invalidate('reference')
     return redirect('/admin/divisions')
 
 @client_blueprint.route('/admin/divisions/<division_id>', methods=['GET', 'POST'])
 @jwt_required
 def admin_edit_division(division_id):
     user = get_identity_if_login()
-    response = requests.get(f'http://matches:5000/divisions/{division_id}')
+    response = upstream.get(f'http://matches:5000/divisions/{division_id}')
     division = response.json()['data']
     if request.method == "GET":
         return render_template('status_division_edit.html', login=True, userclub=user['club'], admin=user['admin'],
@@ -792,10 +782,11 @@ def admin_edit_division(division_id):
         status = request.form.get('division')
         obj = {'divisionname': status}
 
-        response = requests.put(f'http://matches:5000/divisions/{division_id}', data=obj)
+        response = upstream.put(f'http://matches:5000/divisions/{division_id}', data=obj)
         status_code = response.json()['status']
 
         if status_code == 'success':
+            invalidate('reference')
             return redirect('/admin/divisions')
         else:
             return render_template('status_division_edit.html', login=True, userclub=user['club'], admin=user['admin'],
@@ -804,7 +795,7 @@ def admin_edit_division(division_id):
 @client_blueprint.route('/admin/users', methods=['GET'])
 @jwt_required
 def user_admin():
-    response = requests.get('http://users:5000/users')
+    response = upstream.get('http://users:5000/users')
     users = response.json()['data']['users']
 
     user = get_identity_if_login()
@@ -827,7 +818,7 @@ def admin_add_user():
         new_user['superadmin'] = True if request.form.get('superadmin') == 'on' else False
 
 
-        response = requests.post('http://users:5000/users', data=new_user)
+        response = upstream.post('http://users:5000/users', data=new_user)
         status_code = response.json()['status']
 
         if status_code == 'success':
@@ -839,14 +830,14 @@ def admin_add_user():
 @client_blueprint.route('/admin/users/<user_id>/delete', methods=['GET'])
 @jwt_required
 def admin_delete_user(user_id):
-    response = requests.delete(f'http://users:5000/users/{user_id}')
+    response = upstream.delete(f'http://users:5000/users/{user_id}')
     return redirect('/admin/users')
 
 @client_blueprint.route('/admin/users/<user_id>', methods=['GET', 'POST'])
 @jwt_required
 def admin_edit_user(user_id):
     user = get_identity_if_login()
-    response = requests.get(f'http://users:5000/users/{user_id}')
+    response = upstream.get(f'http://users:5000/users/{user_id}')
     query_user = response.json()['data']
     if request.method == "GET":
         return render_template('users_admin_edit.html', login=True, userclub=user['club'], admin=user['admin'],
@@ -860,7 +851,7 @@ def admin_edit_user(user_id):
         new_user['admin'] = True if request.form.get('admin') == 'on' else False
         new_user['superadmin'] = True if request.form.get('superadmin') == 'on' else False
 
-        response = requests.put(f'http://users:5000/users/{user_id}', data=new_user)
+        response = upstream.put(f'http://users:5000/users/{user_id}', data=new_user)
         status_code = response.json()['status']
 
         if status_code == 'success':
@@ -872,7 +863,7 @@ def admin_edit_user(user_id):
 @client_blueprint.route('/admin/teams', methods=['GET'])
 @jwt_required
 def team_admin():
-    response = requests.get('http://teams:5000/teams')
+    response = upstream.get('http://teams:5000/teams')
     teams = response.json()['data']['teams']
 
     user = get_identity_if_login()
@@ -891,10 +882,11 @@ def admin_add_team():
         new_team['suffix'] = request.form.get('suffix')
         new_team['color'] = request.form.get('color')
 
-        response = requests.post('http://teams:5000/teams', data=new_team)
+        response = upstream.post('http://teams:5000/teams', data=new_team)
         status_code = response.json()['status']
 
         if status_code == 'success':
+            invalidate('teams')
             return redirect('/admin/teams')
         else:
             return render_template('teams_admin_add.html', login=True, userclub=user['club'], admin=user['admin'],
@@ -903,14 +895,16 @@ def admin_add_team():
 @client_blueprint.route('/admin/teams/<team_id>/delete', methods=['GET'])
 @jwt_required
 def admin_delete_team(team_id):
-    response = requests.delete(f'http://teams:5000/teams/{team_id}')
+    response = upstream.delete(f'http://teams:5000/teams/{team_id}')
+    if response.status_code == 200:
+        invalidate('teams')
     return redirect('/admin/teams')
 
 @client_blueprint.route('/admin/teams/<team_id>', methods=['GET', 'POST'])
 @jwt_required
 def admin_edit_team(team_id):
     user = get_identity_if_login()
-    response = requests.get(f'http://teams:5000/teams/{team_id}')
+    response = upstream.get(f'http://teams:5000/teams/{team_id}')
     team = response.json()['data']
     if request.method == "GET":
         return render_template('teams_admin_edit.html', login=True, userclub=user['club'], admin=user['admin'],
@@ -921,10 +915,11 @@ def admin_edit_team(team_id):
         new_team['suffix'] = request.form.get('suffix')
         new_team['color'] = request.form.get('color')
 
-        response = requests.put(f'http://teams:5000/teams/{team_id}', data=new_team)
+        response = upstream.put(f'http://teams:5000/teams/{team_id}', data=new_team)
         status_code = response.json()['status']
 
         if status_code == 'success':
+            invalidate('teams')
             return redirect('/admin/teams')
         else:
             return render_template('teams_admin_edit.html', login=True, userclub=user['club'], admin=user['admin'],
@@ -0,0 +1,112 @@
+# services/client/project/api/upstream.py
+# pooled keep-alive http sessions to the users, teams and matches services
+
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+from flask import current_app
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+RETRY_STATUSES = (502, 503, 504)  # the upstream is restarting or overloaded
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_executor = None
+
+
+def create_session(config):
+    """
+    Session with its own connection pool, connections are kept alive between calls
+    Connection errors are retried for every method since nothing was sent yet, read errors and the retry
+    statuses only for the idempotent methods
+    """
+    retries = Retry(total=config['UPSTREAM_RETRIES'], backoff_factor=config['UPSTREAM_BACKOFF'],
+                    status_forcelist=RETRY_STATUSES, allowed_methods=IDEMPOTENT_METHODS, raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config['UPSTREAM_POOL_SIZE'], max_retries=retries)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def session_for(url):
+    """Shared session of the service the url points to, one per host and port"""
+    service = urlsplit(url).netloc
+    session = _sessions.get(service)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(service)
+            if session is None:
+                session = _sessions[service] = create_session(current_app.config)
+    return session
+
+
+def request(method, url, **kwargs):
+    """Like requests.request, through the pool of the service and with the configured timeouts"""
+    kwargs.setdefault('timeout', (current_app.config['UPSTREAM_CONNECT_TIMEOUT'],
+                                  current_app.config['UPSTREAM_READ_TIMEOUT']))
+    return session_for(url).request(method, url, **kwargs)
+
+
+def get(url, params=None, **kwargs):
+    return request('GET', url, params=params, **kwargs)
+
+
+def post(url, data=None, **kwargs):
+    return request('POST', url, data=data, **kwargs)
+
+
+def put(url, data=None, **kwargs):
+    return request('PUT', url, data=data, **kwargs)
+
+
+def delete(url, **kwargs):
+    return request('DELETE', url, **kwargs)
+
+
+def executor():
+    """Thread pool of the process shared by all fan-outs, bounded by UPSTREAM_FANOUT_WORKERS"""
+    global _executor
+    if _executor is None:
+        with _sessions_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=current_app.config['UPSTREAM_FANOUT_WORKERS'],
+                                               thread_name_prefix='upstream')
+    return _executor
+
+
+def fan_out(*calls):
+    """
+    Run independent calls concurrently, e.g. the upstream requests of a page, so the page waits for the
+    slowest call instead of the sum of all of them. The calls run in the app context but outside of the
+    request, and must not fan out themselves: they would wait for workers of the same pool.
+    :param calls: functions without arguments
+    :return: list of the results, in the order of the calls
+    :raises: the exception of the first call that fails, the calls that did not start yet are cancelled
+    """
+    app = current_app._get_current_object()
+
+    def in_app_context(call):
+        with app.app_context():
+            return call()
+
+    futures = [executor().submit(in_app_context, call) for call in calls]
+    done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+    for future in futures:
+        if future in done and future.exception() is not None:
+            for other in pending:
+                other.cancel()
+            raise future.exception()
+    return [future.result() for future in futures]
+
+
+def close():
+    """Close the pooled connections of every service"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -2,6 +2,28 @@
 
 import os
 
+
+def engine_options(database_uri, pool_size=5, max_overflow=10):
+    """
+    Connection pool settings, the defaults can be overridden per environment with DATABASE_POOL_SIZE,
+    DATABASE_MAX_OVERFLOW, DATABASE_POOL_TIMEOUT, DATABASE_POOL_RECYCLE, DATABASE_POOL_PRE_PING and
+    DATABASE_STATEMENT_TIMEOUT (milliseconds, 0 disables it). Only postgres connections are pooled.
+    """
+    if not database_uri or not database_uri.startswith('postgres'):
+        return {}
+    options = {
+        'pool_size': int(os.environ.get('DATABASE_POOL_SIZE', pool_size)),
+        'max_overflow': int(os.environ.get('DATABASE_MAX_OVERFLOW', max_overflow)),
+        'pool_timeout': int(os.environ.get('DATABASE_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DATABASE_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.environ.get('DATABASE_POOL_PRE_PING', '1') == '1'
+    }
+    statement_timeout = int(os.environ.get('DATABASE_STATEMENT_TIMEOUT', 0))
+    if statement_timeout:
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+    return options
+
+
 class BaseConfig:
     """
     Base configuration
@@ -19,15 +41,29 @@ class BaseConfig:
     # Set the secret key to sign the JWTs with
     JWT_SECRET_KEY = '*^*(*&)(*)(*afafafaSDD47j\3yX R~X@H!jmM]Lwf/,?KT'
 
+    # calls to the other services, see project/api/upstream.py
+    UPSTREAM_CONNECT_TIMEOUT = float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', 2))
+    UPSTREAM_READ_TIMEOUT = float(os.environ.get('UPSTREAM_READ_TIMEOUT', 10))
+    UPSTREAM_RETRIES = int(os.environ.get('UPSTREAM_RETRIES', 3))
+    UPSTREAM_BACKOFF = float(os.environ.get('UPSTREAM_BACKOFF', 0.1))  # seconds, doubles every retry
+    UPSTREAM_POOL_SIZE = int(os.environ.get('UPSTREAM_POOL_SIZE', 10))  # kept alive connections per service
+    UPSTREAM_FANOUT_WORKERS = int(os.environ.get('UPSTREAM_FANOUT_WORKERS', 8))  # concurrent calls per process
+
+    # team, club and reference lookups, see project/api/cache.py
+    LOOKUP_CACHE_SIZE = int(os.environ.get('LOOKUP_CACHE_SIZE', 1024))  # entries per cache
+    LOOKUP_CACHE_TTL = float(os.environ.get('LOOKUP_CACHE_TTL', 300))  # seconds
+
 class DevelopmentConfig(BaseConfig):
     """
     Development configuration
     """
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
 
 class TestingConfig(BaseConfig):
     """
     Testing Configuration
     """
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_TEST_URL')
\ No newline at end of file
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_TEST_URL')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI, pool_size=2, max_overflow=5)
@@ -1,16 +1,127 @@
 # services/client/project/tests/test_client.py
 
 import json
+import threading
+import time
 import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
 
 from project import db
+from project.api import upstream
+from project.api.cache import TTLCache, cached, get_cache, invalidate
+from project.api.client import make_league_table
 # from project.api.models import Referee, Division, Status, Match
 from project.tests.base import BaseTestCase
 
 
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Answers 503 to every other request"""
+    calls = 0
+
+    def respond(self):
+        FlakyHandler.calls += 1
+        self.send_response(503 if FlakyHandler.calls % 2 else 200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    do_GET = do_POST = respond
+
+    def log_message(self, *args):
+        pass
+
+
 class TestClientService(BaseTestCase):
     """Test for the Client Service."""
-    pass
+
+    def setUp(self):
+        super().setUp()
+        FlakyHandler.calls = 0
+        self.server = HTTPServer(('127.0.0.1', 0), FlakyHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        self.app.config['UPSTREAM_BACKOFF'] = 0
+
+    def tearDown(self):
+        upstream.close()
+        self.server.shutdown()
+        self.server.server_close()
+        super().tearDown()
+
+    def test_upstream_session_per_service(self):
+        """Ensure the calls to a service share one session"""
+        self.assertIs(upstream.session_for(f'{self.url}/teams'), upstream.session_for(f'{self.url}/clubs'))
+        self.assertIsNot(upstream.session_for(f'{self.url}/teams'), upstream.session_for('http://matches:5000/'))
+
+    def test_upstream_retries_idempotent(self):
+        """Ensure a GET is retried after a 503 and a POST is not"""
+        response = upstream.get(f'{self.url}/teams')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(2, FlakyHandler.calls)
+        response = upstream.post(f'{self.url}/teams', data={'name': 'test'})
+        self.assertEqual(503, response.status_code)
+        self.assertEqual(3, FlakyHandler.calls)
+
+    def test_fan_out(self):
+        """Ensure the fanned out calls run concurrently and their results keep the order of the calls"""
+        barrier = threading.Barrier(3, timeout=5)
+
+        def call(value):
+            barrier.wait()  # only passes when the three calls run at the same time
+            return value
+        self.assertEqual([1, 2, 3], upstream.fan_out(lambda: call(1), lambda: call(2), lambda: call(3)))
+        self.assertEqual([], upstream.fan_out())
+
+    def test_fan_out_fails_fast(self):
+        """Ensure the first failing call is raised without waiting for the slow ones"""
+        def fail():
+            raise ValueError('upstream failed')
+        begin = time.monotonic()
+        with self.assertRaises(ValueError):
+            upstream.fan_out(lambda: time.sleep(1), fail)
+        self.assertLess(time.monotonic() - begin, 0.9)
+
+    def test_ttl_cache(self):
+        """Ensure the cache drops the least recently used entry and expired entries"""
+        now = [0]
+        cache = TTLCache(2, 10, clock=lambda: now[0])
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(1, cache.get('a'))
+        cache.set('c', 3)  # b was used least recently
+        self.assertEqual(None, cache.get('b'))
+        self.assertEqual(3, cache.get('c'))
+        now[0] = 10
+        self.assertEqual(None, cache.get('a'))
+        self.assertEqual((2, 2, 1), (cache.hits, cache.misses, cache.evictions))
+        self.assertEqual(1, len(cache))
+
+    def test_cached_lookup(self):
+        """Ensure a lookup is loaded once, and again after it is invalidated"""
+        loads = []
+        invalidate('clubs')
+        for i in range(3):
+            self.assertEqual('WINAK', cached('clubs', '13', lambda: loads.append(1) or 'WINAK'))
+        self.assertEqual(1, len(loads))
+        invalidate('clubs')
+        cached('clubs', '13', lambda: loads.append(1) or 'WINAK')
+        self.assertEqual(2, len(loads))
+        with self.client:
+            response = self.client.get('/metrics')
+            self.assertIn(f'lookup_cache_hits_total{{cache="clubs"}} {get_cache("clubs").hits}',
+                          response.data.decode())
+
+    def test_make_league_table(self):
+        """Ensure the league table is sorted on points, goal difference and goals scored"""
+        def match(home, away, goals_home, goals_away):
+            return {'hometeam': home, 'awayteam': away, 'goalshome': goals_home, 'goalsaway': goals_away}
+        table = make_league_table([match(1, 2, 1, 0), match(3, 4, 3, 2), match(5, 1, 0, 0), match(2, 5, None, None),
+                                   match(4, 6, 2, 2)])
+        self.assertEqual([1, 3, 6, 5, 4, 2], [entry['name'] for entry in table])
+        self.assertEqual({'name': 1, 'played': 2, 'win': 1, 'loss': 0, 'tie': 1, 'DV': 1, 'DT': 0, 'PT': 4,
+                          'sheet': 2}, table[0])
+        # the unplayed match does not count
+        self.assertEqual(1, table[-1]['played'])
+
 
 if __name__ == '__main__':
     unittest.main()
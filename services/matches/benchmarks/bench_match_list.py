@@ -0,0 +1,76 @@
+# services/matches/benchmarks/bench_match_list.py
+# time GET /matches serialization for a large match table
+#
+# usage (from services/matches): python benchmarks/bench_match_list.py [rows]
+# runs against a temporary sqlite database unless DATABASE_TEST_URL is set
+
+import datetime
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('APP_SETTINGS', 'project.config.TestingConfig')
+os.environ.setdefault('DATABASE_TEST_URL', f'sqlite:///{tempfile.mkdtemp()}/bench.db')
+
+from project import create_app, db  # noqa: E402 (imported after the path is set up)
+from project.api import serializer  # noqa: E402 (imported after the path is set up)
+from project.api.models import Division, Match  # noqa: E402 (imported after the path is set up)
+from project.api.utils import list_response  # noqa: E402 (imported after the path is set up)
+
+
+def seed(rows):
+    db.drop_all()
+    db.create_all()
+    db.session.add(Division('1ste Afdeling'))
+    db.session.commit()
+    start = datetime.date(2018, 9, 1)
+    db.session.bulk_insert_mappings(Match, [
+        {'division_id': 1, 'matchweek': i % 30 + 1, 'date': start + datetime.timedelta(days=i % 300),
+         'time': datetime.time(14, 30), 'home_team_id': i % 97, 'away_team_id': (i + 1) % 97,
+         'goals_home_team': i % 5, 'goals_away_team': None if i % 7 == 0 else i % 3, 'status': None,
+         'referee': None} for i in range(rows)])
+    db.session.commit()
+
+
+def to_json_list():
+    """The previous implementation: model instances, to_json and the stdlib encoder"""
+    matches = [match.to_json() for match in Match.query.order_by(Match.id).all()]
+    return json.dumps({'status': 'success', 'data': {'matches': matches}}).encode()
+
+
+def row_list():
+    """list_response: row tuples and project.api.serializer"""
+    return list_response(Match.query, Match.id, 'matches').get_data()
+
+
+def best_of(function, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        db.session.remove()
+        begin = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - begin)
+    return min(timings)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    app = create_app()
+    with app.app_context():
+        seed(rows)
+        with app.test_request_context('/matches'):
+            print(f'{rows} matches, best of 3')
+            print(f'to_json + json        {best_of(to_json_list):.3f}s')
+            backend = serializer.orjson
+            if backend is not None:
+                print(f'rows + orjson         {best_of(row_list):.3f}s')
+            serializer.orjson = None
+            print(f'rows + json           {best_of(row_list):.3f}s')
+            serializer.orjson = backend
+
+
+if __name__ == '__main__':
+    main()
@@ -10,4 +10,6 @@ echo "PostgreSQL started"
 
 python manage.py recreate-db
 python manage.py seed-db
-gunicorn -b 0.0.0.0:5000 manage:app
\ No newline at end of file
+# threaded workers: an open event stream holds a thread for as long as it is connected, so at most
+# EVENT_STREAMS_PER_WORKER (default 4) of the 8 threads serve /matches/stream, further streams get 503
+gunicorn -b 0.0.0.0:5000 --worker-class gthread --threads 8 manage:app
\ No newline at end of file
@@ -1,12 +1,19 @@
 # services/users/manage.py
 
 import unittest
-import csv
 
+import click
 from flask.cli import FlaskGroup
+from sqlalchemy.sql import column
 
 from project import create_app, db
+from project.api.bulk import bulk_load_file
+from project.api.export import EXPORT_FORMATS, export_matches
+from project.api.matches import filter_matches
 from project.api.models import Referee, Division, Status, Match
+from project.api.partitions import detach_partition, migrate_to_partitions, split_default_partition
+from project.api.seasons import parse_season, season_expression
+from project.api.standings import rebuild_standings
 
 app = create_app()
 cli = FlaskGroup(create_app=create_app)
@@ -43,60 +50,91 @@ def seed_db():
     matches = [matches1, matches2, matches3]
 
 
-    ### read from csv ###
-
-    # read divisions
-    with open(divisions) as fp:
-        reader = csv.reader(fp, delimiter=",")
-        next(reader, None)  # skip headers
-        for row in reader:
-            division_name = row[1]
-            db.session.add(Division(division_name=division_name))
+    ### bulk load from csv ###
+    bulk_load_file(Division.__table__, divisions)
+    bulk_load_file(Referee.__table__, referees, columns=['first_name', 'last_name', 'address', 'zip_code', 'city',
+                                                         'phone_number', 'email', 'birth_date'])
+    bulk_load_file(Status.__table__, statusdata)
+    for match in matches:
+        bulk_load_file(Match.__table__, match, null='NULL')
+    split_default_partition(db.session.connection(), Match.__table__)
     db.session.commit()
 
-    # read referees
-    with open(referees) as fp:
-        reader = csv.reader(fp, delimiter=",")
-        next(reader, None)  # skip headers
-        for row in reader:
-            first_name = row[0]
-            last_name = row[1]
-            address = row[2]
-            zip_code = int(row[3])
-            city = row[4]
-            phone_number = row[5]
-            email = row[6]
-            date_of_birth = row[7]
-            db.session.add(Referee(first_name, last_name, address, zip_code, city, phone_number, email, date_of_birth))
+    # compute league tables
+    rebuild_standings()
+
+
+@cli.command('bulk-import')
+@click.argument('file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--table', required=True, help='Table to load the rows into.')
+@click.option('--columns', default=None, help='Comma separated table columns in csv order, defaults to the header.')
+@click.option('--null', default='', help='Value that stands for NULL in the csv file.')
+def bulk_import(file, table, columns, null):
+    """Loads a csv file into a table in one transaction."""
+    if table not in db.metadata.tables:
+        raise click.BadParameter(f'unknown table {table}', param_hint='--table')
+    try:
+        count = bulk_load_file(db.metadata.tables[table], file, columns.split(',') if columns else None, null)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    if table == Match.__tablename__:
+        split_default_partition(db.session.connection(), Match.__table__)
     db.session.commit()
+    if table == Match.__tablename__:
+        rebuild_standings()
+    click.echo(f'Imported {count} rows into {table}')
+
+
+@cli.command('rebuild-standings')
+def rebuild_standings_command():
+    """Recomputes the league standings from the matches."""
+    rebuild_standings()
+
+
+@cli.command('export-matches')
+@click.argument('file', type=click.Path(dir_okay=False, writable=True))
+@click.option('--format', 'fmt', type=click.Choice(EXPORT_FORMATS), default='npz', help='Export format.')
+@click.option('--season', default=None, help='Only export this season, e.g. 2018-2019.')
+def export_matches_command(file, fmt, season):
+    """Exports the matches as typed columns for analytics."""
+    try:
+        data, _ = export_matches(filter_matches(Match.query, {'season': season}), fmt)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    with open(file, 'wb') as fp:
+        fp.write(data)
+    click.echo(f'Exported matches to {file}')
+
+
+@cli.command('partition-matches')
+def partition_matches():
+    """Adds the season column to a match table created before it and moves the matches into season partitions."""
+    try:
+        seasons = migrate_to_partitions(db.session.connection(), Match.__table__, season_expression(column('date')))
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    db.session.commit()
+    click.echo(f'Partitioned seasons: {", ".join(map(str, seasons)) or "none"}')
+
 
-    # read status
-    with open(statusdata) as fp:
-        reader = csv.reader(fp, delimiter=",")
-        next(reader, None)  # skip headers
-        for row in reader:
-            status_name = row[1]
-            db.session.add(Status(status_name))
+@cli.command('partition-seasons')
+def partition_seasons():
+    """Gives every season in the default partition, e.g. a newly scheduled one, a partition of its own."""
+    seasons = split_default_partition(db.session.connection(), Match.__table__)
     db.session.commit()
+    click.echo(f'Partitioned seasons: {", ".join(map(str, seasons)) or "none"}')
 
-    # read matches
-    for match in matches:
-        with open(match) as fp:
-            reader = csv.reader(fp, delimiter=",")
-            next(reader, None)  # skip headers
-            for row in reader:
-                division_id = int(row[0])
-                matchweek = int(row[1])
-                date = row[2]
-                time = row[3]
-                home_team_id = int(row[4])
-                away_team_id = int(row[5])
-                goals_home_team = int(row[6]) if row[6] != "NULL" else None
-                goals_away_team = int(row[7]) if row[7] != "NULL" else None
-                status = int(row[8]) if row[8] != "NULL" else None
-                db.session.add(Match(division_id, matchweek, date, time, home_team_id, away_team_id, goals_home_team,
-                                     goals_away_team, status))
-        db.session.commit()
+
+@cli.command('archive-season')
+@click.argument('season')
+def archive_season(season):
+    """Detaches the partition of a season, its matches stay behind in a plain table."""
+    try:
+        table = detach_partition(db.session.connection(), Match.__table__, parse_season(season))
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    db.session.commit()
+    click.echo(f'Detached season {season} into table {table}')
 
 if __name__ == '__main__':
     cli()
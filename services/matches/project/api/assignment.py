@@ -0,0 +1,69 @@
+# services/matches/project/api/assignment.py
+# automatic referee assignment for a whole matchweek
+
+import datetime
+
+from sqlalchemy.sql import func
+
+from project import db
+from project.api.models import Match, Referee
+from project.api.seasons import season_of
+
+
+def matchweek_matches(division_id, matchweek, season=None):
+    """
+    Matches of a matchweek in kickoff order
+    :param season: start year of the season, defaults to the latest season with this matchweek
+    :return: list of matches, empty if the matchweek does not exist
+    """
+    query = Match.query.filter(Match.division_id == division_id, Match.matchweek == matchweek)
+    if season is None:
+        season = db.session.query(func.max(Match.season)).filter(Match.division_id == division_id,
+                                                                 Match.matchweek == matchweek).scalar()
+        if season is None:
+            return []
+    return query.filter(Match.season == season).order_by(Match.date, Match.time, Match.id).all()
+
+
+def assign_referees(matches, duration):
+    """
+    Give every match without a referee one, the referee with the fewest matches this season that is free
+    at kickoff goes first. The caller commits, so the whole matchweek is assigned in one transaction
+    :param matches: matches of one matchweek in kickoff order
+    :param duration: timedelta in which two kickoffs of the same referee overlap
+    :return: dict of match id -> referee id of the new assignments
+    :raises ValueError: if there are not enough free referees
+    """
+    unassigned = [match for match in matches if match.referee is None]
+    if not unassigned:
+        return {}
+    dates = {match.date for match in unassigned}
+    season = season_of(min(dates))
+
+    # workload of every referee this season, 0 for referees without matches
+    load = {referee_id: 0 for referee_id, in db.session.query(Referee.id)}
+    load.update(db.session.query(Match.referee, func.count(Match.id)).filter(
+        Match.referee.isnot(None), Match.season == season).group_by(Match.referee))
+
+    # kickoffs the referees already lead on the matchweek's dates
+    booked = {}
+    for referee_id, date, time in db.session.query(Match.referee, Match.date, Match.time).filter(
+            Match.referee.isnot(None), Match.date.in_(dates)):
+        booked.setdefault(referee_id, []).append(datetime.datetime.combine(date, time))
+
+    def available(referee_id, kickoff):
+        return all(abs(kickoff - other) >= duration for other in booked.get(referee_id, []))
+
+    assignments = {}
+    for match in unassigned:
+        kickoff = datetime.datetime.combine(match.date, match.time)
+        candidates = [referee_id for referee_id in load if available(referee_id, kickoff)]
+        if not candidates:
+            raise ValueError(f'No referee available for match {match.id}')
+        referee_id = min(candidates, key=lambda candidate: (load[candidate], candidate))
+        assignments[match.id] = referee_id
+        load[referee_id] += 1
+        booked.setdefault(referee_id, []).append(kickoff)
+    db.session.bulk_update_mappings(Match, [{'id': match_id, 'referee': referee_id}
+                                            for match_id, referee_id in assignments.items()])
+    return assignments
@@ -0,0 +1,137 @@
+# services/matches/project/api/batch.py
+# helpers for the batch endpoints, a list of create/update/delete operations applied in one transaction
+
+from flask import jsonify
+from sqlalchemy import exc
+
+from project import db
+
+OPERATIONS = ('create', 'update', 'delete')
+MAX_OPERATIONS = 1000
+
+
+class BatchItemError(Exception):
+    """An operation of a batch can not be applied, the message ends up in its result"""
+
+
+def parse_operations(payload):
+    """
+    Validate the envelope of a batch: a list of {'op': 'create', 'data': {...}}, {'op': 'update', 'id': <id>,
+    'data': {...}} and {'op': 'delete', 'id': <id>} operations
+    :raises ValueError: if the payload is not a valid batch
+    """
+    if not isinstance(payload, list) or not 0 < len(payload) <= MAX_OPERATIONS:
+        raise ValueError('A batch is a list of operations')
+    for operation in payload:
+        if not isinstance(operation, dict) or operation.get('op') not in OPERATIONS:
+            raise ValueError(f'Invalid operation: {operation}')
+        if operation['op'] != 'create' and not isinstance(operation.get('id'), int):
+            raise ValueError(f'Operation without id: {operation}')
+        if operation['op'] != 'delete' and not isinstance(operation.get('data'), dict):
+            raise ValueError(f'Operation without data: {operation}')
+    return payload
+
+
+def from_json(model, data, parsers=None, exclude=()):
+    """
+    Attribute values for a model from the json keys of its JSON_FIELDS
+    :param parsers: dict of json key -> function converting the json value
+    :param exclude: json keys that can not be written
+    :raises ValueError: on unknown keys
+    """
+    parsers = parsers or {}
+    values = {}
+    for key, value in data.items():
+        if key not in model.JSON_FIELDS or key in exclude:
+            raise ValueError(f'Unknown field: {key}')
+        values[model.JSON_FIELDS[key]] = parsers[key](value) if key in parsers and value is not None else value
+    return values
+
+
+def delete_returning(model, ids, *columns):
+    """
+    Delete the rows with the given primary keys in one statement
+    :param columns: extra columns of the deleted rows to return
+    :return: list of (key, *columns) tuples of the rows that were deleted
+    """
+    table = model.__table__
+    key = table.primary_key.columns.values()[0]
+    returned = [key] + [table.c[column.key] for column in columns]
+    statement = table.delete().where(key.in_(ids))
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return db.session.execute(statement.returning(*returned)).fetchall()
+    # without DELETE ... RETURNING read the rows first, in the same transaction
+    rows = db.session.execute(db.select(returned).where(key.in_(ids))).fetchall()
+    db.session.execute(statement)
+    return rows
+
+
+def run_batch(operations, create, update, delete):
+    """
+    Apply the operations in order in one transaction, all or nothing. Consecutive deletes are combined into
+    a single statement
+    :param create: function(data) -> the new (added) model instance
+    :param update: function(id, data), raises BatchItemError if the row does not exist
+    :param delete: function(ids) -> set of the ids that were deleted
+    :return: flask response with a result per operation
+    """
+    results = [{'index': index, 'op': operation['op'], 'id': operation.get('id'), 'status': 'skipped'}
+               for index, operation in enumerate(operations)]
+    failed = False
+    index = 0
+    while index < len(operations) and not failed:
+        # a step is a single create or update, or a run of deletes
+        end = index + 1
+        if operations[index]['op'] == 'delete':
+            while end < len(operations) and operations[end]['op'] == 'delete':
+                end += 1
+        step = results[index:end]
+        try:
+            operation = operations[index]
+            if operation['op'] == 'create':
+                instance = create(operation['data'])
+                db.session.flush()
+                step[0]['id'] = db.inspect(instance).identity[0]
+            elif operation['op'] == 'update':
+                update(operation['id'], operation['data'])
+                db.session.flush()
+            else:
+                deleted = delete([result['id'] for result in step])
+                for result in step:
+                    if result['id'] not in deleted:
+                        result.update(status='fail', message='Does not exist')
+                        failed = True
+            for result in step:
+                if result['status'] == 'skipped':
+                    result['status'] = 'success'
+        except BatchItemError as e:
+            step[0].update(status='fail', message=str(e))
+            failed = True
+        except (ValueError, TypeError, KeyError):
+            step[0].update(status='fail', message='Invalid payload.')
+            failed = True
+        except exc.IntegrityError:
+            for result in step:
+                result.update(status='fail', message='Invalid input data')
+            failed = True
+        index = end
+
+    if not failed:
+        try:
+            db.session.commit()
+        except exc.IntegrityError:
+            failed = True
+    if failed:
+        db.session.rollback()
+        response_object = {
+            'status': 'fail',
+            'message': 'Batch failed, nothing was applied.',
+            'data': {'results': results}
+        }
+        return jsonify(response_object), 400
+    response_object = {
+        'status': 'success',
+        'message': f'{len(operations)} operations applied.',
+        'data': {'results': results}
+    }
+    return jsonify(response_object), 200
@@ -0,0 +1,90 @@
+# services/matches/project/api/bulk.py
+# bulk loading of csv files, COPY on PostgreSQL and executemany on other databases
+
+import csv
+import io
+import itertools
+
+from project import db
+from project.api.versions import mark_written
+
+BATCH_SIZE = 1000  # rows per executemany call when COPY is not available
+
+
+def bulk_load(table, fp, columns=None, null=''):
+    """
+    Load a csv file into a table without creating ORM objects, the caller commits
+    :param table: sqlalchemy table to load into
+    :param fp: csv file opened in text mode, the first line is a header
+    :param columns: table columns in the order of the csv columns, defaults to the header
+    :param null: value that stands for NULL in the csv file
+    :return: number of loaded rows
+    """
+    header = next(csv.reader([fp.readline()]))
+    columns = columns or header
+    if len(columns) != len(header):
+        raise ValueError(f'Expected {len(header)} columns, got {len(columns)}')
+    for column in columns:
+        if column not in table.columns:
+            raise ValueError(f'Table {table.name} has no column {column}')
+    derived = {column: source for column, source in table.info.get('derived', {}).items() if column not in columns}
+    if derived:
+        fp = derive_columns(fp, columns, derived, null)
+        columns = list(columns) + list(derived)
+
+    connection = db.session.connection()
+    preparer = connection.dialect.identifier_preparer
+    table_name = preparer.format_table(table)
+    column_names = ', '.join(preparer.quote(column) for column in columns)
+    cursor = connection.connection.cursor()
+    # the rows bypass sqlalchemy, so the table version is bumped explicitly
+    mark_written(connection, table.name)
+
+    if connection.dialect.name == 'postgresql':
+        null = null.replace("'", "''")
+        cursor.copy_expert(f"COPY {table_name} ({column_names}) FROM STDIN WITH (FORMAT csv, NULL '{null}')", fp)
+        count = cursor.rowcount
+        # explicit ids were loaded, move the id sequences past them
+        for column in table.primary_key.columns:
+            if column.name in columns:
+                connection.execute(
+                    f"SELECT setval(pg_get_serial_sequence(%(table)s, %(column)s), "
+                    f"COALESCE(MAX({preparer.quote(column.name)}), 0) + 1, false) FROM {table_name}",
+                    {'table': table_name, 'column': column.name})
+        return count
+
+    placeholder = '?' if connection.dialect.paramstyle == 'qmark' else '%s'
+    statement = f"INSERT INTO {table_name} ({column_names}) VALUES ({', '.join([placeholder] * len(columns))})"
+    rows = ([None if value == null else value for value in row] for row in csv.reader(fp))
+    count = 0
+    while True:
+        batch = list(itertools.islice(rows, BATCH_SIZE))
+        if not batch:
+            return count
+        cursor.executemany(statement, batch)
+        count += len(batch)
+
+
+def derive_columns(fp, columns, derived, null):
+    """
+    Append the columns the csv leaves out but that are computed from other columns, e.g. the season of a match
+    :param derived: column -> (source column, function of the source value)
+    :return: csv file with the derived columns at the end of every row
+    """
+    sources = []
+    for column, (source, function) in derived.items():
+        if source not in columns:
+            raise ValueError(f'Column {column} is computed from {source}, which is not loaded')
+        sources.append((columns.index(source), function))
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator='\n')
+    for row in csv.reader(fp):
+        writer.writerow(row + [null if row[index] == null else function(row[index]) for index, function in sources])
+    out.seek(0)
+    return out
+
+
+def bulk_load_file(table, path, columns=None, null=''):
+    """Load the csv file at the given path into a table, see bulk_load"""
+    with io.open(path, newline='') as fp:
+        return bulk_load(table, fp, columns, null)
@@ -0,0 +1,184 @@
+# services/matches/project/api/events.py
+# match change events, published when the transaction that caused them commits
+
+import json
+import logging
+import queue
+import select
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.orm import Session
+
+from project import db
+
+CHANNEL = 'match_events'  # postgres NOTIFY channel
+PENDING_KEY = 'match_events'  # events waiting for the commit of a session
+SUBSCRIBER_BACKLOG = 100  # events kept for a slow subscriber before it starts missing them
+LISTEN_BACKOFF = (1, 60)  # seconds before reconnecting the LISTEN connection, doubled up to the maximum
+
+logger = logging.getLogger(__name__)
+
+
+class TooManyStreams(Exception):
+    """Every stream this process may serve is open"""
+
+
+class Broadcaster:
+    """Fans out published events to every subscribed stream of this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def subscribe(self, limit=None):
+        """
+        :param limit: maximum number of subscribers
+        :raises TooManyStreams: if the limit is reached
+        """
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_BACKLOG)
+        with self._lock:
+            if limit is not None and len(self._subscribers) >= limit:
+                raise TooManyStreams()
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, payload):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(payload)
+            except queue.Full:
+                pass
+
+
+broadcaster = Broadcaster()
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def queue_event(action, match):
+    """
+    Announce a change of a match once the current transaction commits
+    :param action: 'add', 'update' or 'delete'
+    :param match: the (flushed) match, or the id of the match for 'delete'
+    """
+    if action == 'delete':
+        data = {'id': match}
+    else:
+        # read back the stored row, the attributes may still hold the raw form values
+        db.session.refresh(match)
+        data = match.to_json()
+    payload = json.dumps({'action': action, 'match': data}, separators=(',', ':'))
+    db.session.info.setdefault(PENDING_KEY, []).append(payload)
+
+
+def uses_notify(session):
+    return session.get_bind().dialect.name == 'postgresql'
+
+
+@event.listens_for(Session, 'before_commit')
+def notify_events(session):
+    """On postgres the events go out with NOTIFY, which is only delivered if the transaction commits"""
+    if session.info.get(PENDING_KEY) and uses_notify(session):
+        for payload in session.info.pop(PENDING_KEY):
+            session.execute(db.text('SELECT pg_notify(:channel, :payload)'),
+                            {'channel': CHANNEL, 'payload': payload})
+
+
+@event.listens_for(Session, 'after_commit')
+def publish_events(session):
+    """Without postgres the events only reach the streams of this process"""
+    for payload in session.info.pop(PENDING_KEY, []):
+        broadcaster.publish(payload)
+
+
+@event.listens_for(Session, 'after_rollback')
+def drop_events(session):
+    session.info.pop(PENDING_KEY, None)
+
+
+def _connect(engine):
+    """Dedicated connection outside of the pool, it stays in LISTEN mode"""
+    connection = engine.raw_connection()
+    connection.detach()
+    connection = connection.connection
+    connection.autocommit = True
+    connection.cursor().execute(f'LISTEN {CHANNEL}')
+    return connection
+
+
+def _listen(engine):
+    """
+    Forward the notifications of all processes to the local broadcaster
+    A lost connection is logged and opened again with a growing delay, the events sent in between are missed
+    """
+    delay = LISTEN_BACKOFF[0]
+    while True:
+        connection = None
+        try:
+            connection = _connect(engine)
+            delay = LISTEN_BACKOFF[0]
+            while True:
+                if select.select([connection], [], [], 60) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    broadcaster.publish(connection.notifies.pop(0).payload)
+        except (exc.DBAPIError, engine.dialect.dbapi.Error, OSError):
+            logger.exception('Listening to %s failed, reconnecting in %s seconds', CHANNEL, delay)
+        finally:
+            if connection is not None:
+                try:
+                    connection.close()
+                except engine.dialect.dbapi.Error:
+                    pass
+        time.sleep(delay)
+        delay = min(delay * 2, LISTEN_BACKOFF[1])
+
+
+def subscribe(limit=None):
+    """
+    Subscribe to the match events, on postgres the first subscriber starts listening to the notifications
+    :param limit: maximum number of subscribers of this process
+    :return: queue receiving the json payloads, hand back to unsubscribe
+    :raises TooManyStreams: if the limit is reached
+    """
+    global _listener
+    subscriber = broadcaster.subscribe(limit)
+    if db.engine.dialect.name == 'postgresql':
+        with _listener_lock:
+            if _listener is None or not _listener.is_alive():
+                _listener = threading.Thread(target=_listen, args=(db.engine,), daemon=True)
+                _listener.start()
+    return subscriber
+
+
+def unsubscribe(subscriber):
+    broadcaster.unsubscribe(subscriber)
+
+
+def event_stream(subscriber, retry=3000, keepalive=15):
+    """
+    Server-sent event stream of the match events
+    :param subscriber: queue returned by subscribe, unsubscribed when the stream ends
+    :param retry: milliseconds the browser waits before reconnecting
+    :param keepalive: seconds of silence after which a comment keeps the connection open
+    """
+    try:
+        yield f'retry: {retry}\n\n'
+        while True:
+            try:
+                payload = subscriber.get(timeout=keepalive)
+            except queue.Empty:
+                yield ': keepalive\n\n'
+                continue
+            yield f'event: match\ndata: {payload}\n\n'
+    finally:
+        unsubscribe(subscriber)
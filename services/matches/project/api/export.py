@@ -0,0 +1,103 @@
+# services/matches/project/api/export.py
+# columnar export of the matches for analytics
+
+import io
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+except ImportError:  # the arrow format is only available when pyarrow is installed
+    pa = None
+
+from project.api.models import Match
+
+NPZ_MIMETYPE = 'application/octet-stream'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+EXPORT_FORMATS = ('npz', 'arrow')
+MISSING = -1  # placeholder for NULL in the integer columns of an npz export, see the masks
+MASK_SUFFIX = '_mask'  # npz array of a nullable column that is True where the value is NULL
+
+# exported name -> (table column, numpy dtype), times are exported as seconds since midnight
+EXPORT_COLUMNS = [
+    ('id', Match.__table__.c.id, 'int32'),
+    ('division', Match.__table__.c.division_id, 'int32'),
+    ('matchweek', Match.__table__.c.matchweek, 'int16'),
+    ('date', Match.__table__.c.date, 'datetime64[D]'),
+    ('time', Match.__table__.c.time, 'timedelta64[s]'),
+    ('hometeam', Match.__table__.c.home_team_id, 'int32'),
+    ('awayteam', Match.__table__.c.away_team_id, 'int32'),
+    ('goalshome', Match.__table__.c.goals_home_team, 'int16'),
+    ('goalsaway', Match.__table__.c.goals_away_team, 'int16'),
+    ('status', Match.__table__.c.status, 'int32'),
+    ('referee', Match.__table__.c.referee, 'int32'),
+]
+
+
+def export_columns(query):
+    """
+    Fetch the exported columns of the matches with a single query, every column is converted by numpy at once
+    :param query: (filtered) query on Match
+    :return: dict of name -> numpy array, dict of name -> null mask for the nullable columns
+    """
+    rows = query.with_entities(*(column for _, column, _ in EXPORT_COLUMNS)).order_by(Match.id).all()
+    values = list(zip(*rows)) if rows else [()] * len(EXPORT_COLUMNS)
+    arrays, masks = {}, {}
+    for (name, column, dtype), column_values in zip(EXPORT_COLUMNS, values):
+        if name == 'time':
+            # numpy parses the times as 'HH:MM:SS' on the first day of the epoch
+            array = np.char.add('1970-01-01T', np.array(column_values, dtype='U8')).astype('datetime64[s]')
+            arrays[name] = (array - np.datetime64(0, 's')).astype(dtype)
+        elif column.nullable:
+            array = np.array(column_values, dtype=object)
+            masks[name] = np.equal(array, None).astype(bool)
+            array[masks[name]] = MISSING
+            arrays[name] = array.astype(dtype)
+        else:
+            arrays[name] = np.array(column_values, dtype=dtype)
+    return arrays, masks
+
+
+def to_npz(arrays, masks):
+    """
+    Serialize the columns as a compressed numpy archive, NULL is stored as MISSING and every nullable column
+    comes with a boolean <column>_mask array, e.g. for numpy.ma.masked_array(goalshome, goalshome_mask)
+    """
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays, **{name + MASK_SUFFIX: mask for name, mask in masks.items()})
+    return buffer.getvalue()
+
+
+def to_arrow(arrays, masks):
+    """Serialize the columns as an arrow ipc stream, NULL is stored as a real null"""
+    columns = []
+    for name, _, _ in EXPORT_COLUMNS:
+        if name == 'time':
+            column = pa.array(arrays[name].astype('int32')).cast(pa.time32('s'))
+        else:
+            column = pa.array(arrays[name], mask=masks.get(name))
+        columns.append(column)
+    table = pa.Table.from_arrays(columns, names=[name for name, _, _ in EXPORT_COLUMNS])
+    sink = pa.BufferOutputStream()
+    writer = pa.RecordBatchStreamWriter(sink, table.schema)
+    writer.write_table(table)
+    writer.close()
+    return sink.getvalue().to_pybytes()
+
+
+def export_matches(query, fmt):
+    """
+    Export the matches of a query as typed columns
+    :param query: (filtered) query on Match
+    :param fmt: 'npz' or 'arrow'
+    :return: exported bytes, mimetype
+    :raises ValueError: if the format is unknown or not available
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'Unknown export format: {fmt}')
+    if fmt == 'arrow' and pa is None:
+        raise ValueError('Arrow export requires pyarrow')
+    arrays, masks = export_columns(query)
+    if fmt == 'arrow':
+        return to_arrow(arrays, masks), ARROW_MIMETYPE
+    return to_npz(arrays, masks), NPZ_MIMETYPE
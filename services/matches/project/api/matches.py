@@ -1,11 +1,22 @@
 # services/matches/project/api/matches.py
 # CRUD operations for matches and referees
 
-from flask import Blueprint, jsonify, request, render_template
-from sqlalchemy import exc
+from flask import Blueprint, Response, jsonify, request, render_template, current_app, stream_with_context
+from sqlalchemy import exc, or_, and_, case
 from sqlalchemy.sql import func
 
-from project.api.models import Referee, Status, Division, Match
+from project.api.assignment import assign_referees, matchweek_matches
+from project.api.batch import BatchItemError, delete_returning, from_json, parse_operations, run_batch
+from project.api.events import TooManyStreams, event_stream, queue_event, subscribe, unsubscribe
+from project.api.export import export_matches
+from project.api.models import Referee, Status, Division, Match, Standing
+from project.api.reference import reference_row, reference_rows
+from project.api.scheduling import create_schedule, DEFAULT_KICKOFF
+from project.api.seasons import parse_season
+from project.api.standings import apply_match, match_state
+from project.api.statistics import season_statistics
+from project.api.utils import list_response
+from project.api.versions import versioned
 from project import db
 
 import datetime
@@ -13,6 +24,16 @@ import datetime
 matches_blueprint = Blueprint('matches', __name__)
 
 
+def parse_date(value):
+    """Parse a date as sent to the api, e.g. '2018-09-05'"""
+    return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def parse_time(value):
+    """Parse a kickoff time as sent to the api, e.g. '14:30:00'"""
+    return datetime.datetime.strptime(value, '%H:%M:%S').time()
+
+
 ### REFEREE ###
 # ping
 @matches_blueprint.route('/referees/ping', methods=['GET'])
@@ -56,6 +77,7 @@ def add_referee():
 # read
 # get single referee (by ID)
 @matches_blueprint.route('/referees/<referee_id>', methods=['GET'])
+@versioned('referee')
 def get_single_referee(referee_id):
     """Get single referee details"""
     response_object = {
@@ -88,15 +110,10 @@ def get_single_referee(referee_id):
 
 # get all referees
 @matches_blueprint.route('/referees', methods=['GET'])
+@versioned('referee')
 def get_all_referees():
     """Get all referees"""
-    response_object = {
-        'status': 'success',
-        'data': {
-            'referees': [referee.to_json() for referee in Referee.query.all()]
-        }
-    }
-    return jsonify(response_object), 200
+    return list_response(Referee.query, Referee.id, 'referees')
 
 
 # update
@@ -147,11 +164,9 @@ def delete_referee(referee_id):
         'message': 'Referee does not exist'
     }
     try:
-        referee = Referee.query.filter_by(id=int(referee_id)).first()
-        if not referee:
+        if not Referee.query.filter_by(id=int(referee_id)).delete():
             return jsonify(response_object), 404
         else:
-            Referee.query.filter_by(id=int(referee_id)).delete()
             db.session.commit()
             response_object = {
                 'status': 'success',
@@ -166,6 +181,38 @@ def delete_referee(referee_id):
         return jsonify(response_object), 400
 
 
+# batch
+@matches_blueprint.route('/referees/batch', methods=['POST'])
+def batch_referees():
+    """Create, update and delete referees in one transaction, see project.api.batch"""
+    try:
+        operations = parse_operations(request.get_json(silent=True))
+    except ValueError:
+        response_object = {
+            'status': 'fail',
+            'message': 'Invalid payload.'
+        }
+        return jsonify(response_object), 400
+    parsers = {'birthdate': parse_date}
+
+    def create(data):
+        referee = Referee(**from_json(Referee, data, parsers, exclude=('id',)))
+        db.session.add(referee)
+        return referee
+
+    def update(referee_id, data):
+        referee = Referee.query.get(referee_id)
+        if not referee:
+            raise BatchItemError('Referee does not exist')
+        for attribute, value in from_json(Referee, data, parsers, exclude=('id',)).items():
+            setattr(referee, attribute, value)
+
+    def delete(referee_ids):
+        return {referee_id for referee_id, in delete_returning(Referee, referee_ids)}
+
+    return run_batch(operations, create, update, delete)
+
+
 ### DIVISION ###
 # ping
 @matches_blueprint.route('/divisions/ping', methods=['GET'])
@@ -202,6 +249,7 @@ def add_division():
 # read
 # get single division (by ID)
 @matches_blueprint.route('/divisions/<division_id>', methods=['GET'])
+@versioned('division')
 def get_single_division(division_id):
     """Get single division details"""
     response_object = {
@@ -209,16 +257,13 @@ def get_single_division(division_id):
         'message': 'Division does not exist'
     }
     try:
-        division = Division.query.filter_by(id=int(division_id)).first()
+        division = reference_row('divisions', int(division_id))
         if not division:
             return jsonify(response_object), 404
         else:
             response_object = {
                 'status': 'success',
-                'data': {
-                    'id': division.id,
-                    'divisionname': division.division_name
-                }
+                'data': division
             }
             return jsonify(response_object), 200
     except ValueError:
@@ -227,15 +272,10 @@ def get_single_division(division_id):
 
 # get all divisions
 @matches_blueprint.route('/divisions', methods=['GET'])
+@versioned('division')
 def get_all_divisions():
     """Get all divisions"""
-    response_object = {
-        'status': 'success',
-        'data': {
-            'divisions': [division.to_json() for division in Division.query.all()]
-        }
-    }
-    return jsonify(response_object), 200
+    return list_response(Division.query, Division.id, 'divisions')
 
 
 # update
@@ -279,16 +319,13 @@ def delete_division(division_id):
         'message': 'Division does not exist'
     }
     try:
-        division = Division.query.filter_by(id=int(division_id)).first()
-        if not division:
+        # check if there is a match containing division id, if so return error
+        if db.session.query(Match.query.filter_by(division_id=int(division_id)).exists()).scalar():
+            response_object['message'] = 'Failed to delete division: division still has existing matches'
+            return jsonify(response_object), 400
+        if not Division.query.filter_by(id=int(division_id)).delete():
             return jsonify(response_object), 404
         else:
-            # check if there is a match containing division id, if so return error
-            match = Match.query.filter_by(division_id=division_id).first()
-            if match:
-                response_object['message'] = 'Failed to delete division: division still has existing matches'
-                return jsonify(response_object), 400
-            Division.query.filter_by(id=int(division_id)).delete()
             db.session.commit()
             response_object = {
                 'status': 'success',
@@ -339,6 +376,7 @@ def add_status():
 # read
 # get single status (by ID)
 @matches_blueprint.route('/status/<status_id>', methods=['GET'])
+@versioned('status')
 def get_single_status(status_id):
     """Get single status details"""
     response_object = {
@@ -346,16 +384,13 @@ def get_single_status(status_id):
         'message': 'Status does not exist'
     }
     try:
-        status = Status.query.filter_by(id=int(status_id)).first()
+        status = reference_row('status', int(status_id))
         if not status:
             return jsonify(response_object), 404
         else:
             response_object = {
                 'status': 'success',
-                'data': {
-                    'id': status.id,
-                    'statusname': status.status_name
-                }
+                'data': status
             }
             return jsonify(response_object), 200
     except ValueError:
@@ -364,15 +399,10 @@ def get_single_status(status_id):
 
 # get all status
 @matches_blueprint.route('/status', methods=['GET'])
+@versioned('status')
 def get_all_status():
     """Get all status"""
-    response_object = {
-        'status': 'success',
-        'data': {
-            'status': [status.to_json() for status in Status.query.all()]
-        }
-    }
-    return jsonify(response_object), 200
+    return list_response(Status.query, Status.id, 'status')
 
 
 # update
@@ -416,11 +446,9 @@ def delete_status(status_id):
         'message': 'Status does not exist'
     }
     try:
-        status = Status.query.filter_by(id=int(status_id)).first()
-        if not status:
+        if not Status.query.filter_by(id=int(status_id)).delete():
             return jsonify(response_object), 404
         else:
-            Status.query.filter_by(id=int(status_id)).delete()
             db.session.commit()
             response_object = {
                 'status': 'success',
@@ -436,6 +464,28 @@ def delete_status(status_id):
 
 
 ### MATCH ###
+def referee_double_booked(referee, date, time, match_id=None):
+    """
+    Check if a referee already leads a match that overlaps with a kickoff, two kickoffs of the same referee
+    overlap when they are less than MATCH_DURATION_MINUTES apart
+    :param referee: id of the referee
+    :param date: date of the match
+    :param time: kickoff time of the match
+    :param match_id: id of the match being updated, excluded from the check
+    :return: True if the referee is not available
+    """
+    duration = datetime.timedelta(minutes=current_app.config['MATCH_DURATION_MINUTES'])
+    slack = max(duration - datetime.timedelta(seconds=1), datetime.timedelta(0))
+    kickoff = datetime.datetime.combine(date, time)
+    begin = max(kickoff - slack, datetime.datetime.combine(date, datetime.time.min))
+    end = min(kickoff + slack, datetime.datetime.combine(date, datetime.time.max))
+    query = Match.query.filter(Match.referee == int(referee), Match.date == date,
+                               Match.time.between(begin.time(), end.time()))
+    if match_id is not None:
+        query = query.filter(Match.id != match_id)
+    return db.session.query(query.exists()).scalar()
+
+
 # ping
 @matches_blueprint.route('/matches/ping', methods=['GET'])
 def ping_matches():
@@ -469,27 +519,127 @@ def add_match():
     if 'referee' in post_data:
         referee = post_data.get('referee')
     try:
-        if referee is not None:
-            toCheck = Match.query.filter_by(referee=referee).all()
-            for match in toCheck:
-                match_json = match.to_json()
-                if match_json['date'] == date and match_json['time'] == time:
-                    response_object['message'] = 'Referee double booked'
-                    return jsonify(response_object), 400
-        db.session.add(
-            Match(division, matchweek, date, time, hometeam, awayteam, goalshome, goalsaway, status, referee))
+        date = datetime.datetime.strptime(date, '%Y-%m-%d').date()
+        time = datetime.datetime.strptime(time, '%H:%M:%S').time()
+        if referee is not None and referee_double_booked(referee, date, time):
+            response_object['message'] = 'Referee double booked'
+            return jsonify(response_object), 400
+        match = Match(division, matchweek, date, time, hometeam, awayteam, goalshome, goalsaway, status, referee)
+        db.session.add(match)
+        apply_match(division, date, hometeam, awayteam, goalshome, goalsaway)
+        db.session.flush()
+        queue_event('add', match)
         db.session.commit()
         response_object['status'] = 'success'
         response_object['message'] = 'Match successfully created!'
         return jsonify(response_object), 201
+    except (ValueError, TypeError):
+        db.session.rollback()
+        return jsonify(response_object), 400
     except exc.IntegrityError as e:
         db.session.rollback()
+        # a concurrent request may have booked the referee in the meantime
+        if referee is not None and referee_double_booked(referee, date, time):
+            response_object['message'] = 'Referee double booked'
         return jsonify(response_object), 400
 
 
+# generate the fixtures of a season
+@matches_blueprint.route('/divisions/<division_id>/schedule', methods=['POST'])
+def add_schedule(division_id):
+    """
+    Add a double round-robin season for a division
+    Form: season (2018-2019), teams (comma separated ids), optional start (first matchweek), time (kickoff)
+    and interval (days between matchweeks)
+    """
+    post_data = request.form
+    response_object = {
+        'status': 'fail',
+        'message': 'Invalid payload.'
+    }
+    if not post_data:
+        return jsonify(response_object), 400
+    try:
+        division = Division.query.filter_by(id=int(division_id)).first()
+    except ValueError:
+        division = None
+    if not division:
+        response_object['message'] = 'Division does not exist'
+        return jsonify(response_object), 404
+    try:
+        season = parse_season(post_data.get('season'))
+        teams = [int(team) for team in post_data.get('teams').split(',')]
+        start = post_data.get('start')
+        if start is not None:
+            start = datetime.datetime.strptime(start, '%Y-%m-%d').date()
+        kickoff = post_data.get('time')
+        kickoff = datetime.datetime.strptime(kickoff, '%H:%M:%S').time() if kickoff is not None else DEFAULT_KICKOFF
+        interval = int(post_data.get('interval', 7))
+        if interval < 1:
+            raise ValueError(interval)
+        if Match.query.filter(Match.division_id == division.id, Match.season == season).first():
+            response_object['message'] = 'Season already scheduled'
+            return jsonify(response_object), 400
+        count = create_schedule(division.id, season, teams, start, kickoff, interval)
+        db.session.commit()
+        response_object['status'] = 'success'
+        response_object['message'] = f'{count} matches scheduled'
+        return jsonify(response_object), 201
+    except (ValueError, TypeError, AttributeError):
+        db.session.rollback()
+        return jsonify(response_object), 400
+    except exc.IntegrityError as e:
+        db.session.rollback()
+        return jsonify(response_object), 400
+
+
+# assign referees to a whole matchweek
+@matches_blueprint.route('/matchweeks/<division_id>/<matchweek>/assign-referees', methods=['POST'])
+def assign_matchweek_referees(division_id, matchweek):
+    """
+    Assign a referee to every match of a matchweek without one, balancing the workload of the referees
+    Form: optional season (2018-2019), defaults to the latest season with this matchweek
+    """
+    response_object = {
+        'status': 'fail',
+        'message': 'Matchweek does not exist'
+    }
+    try:
+        season = request.form.get('season')
+        if season is not None:
+            season = parse_season(season)
+        matches = matchweek_matches(int(division_id), int(matchweek), season)
+    except ValueError:
+        return jsonify(response_object), 404
+    if not matches:
+        return jsonify(response_object), 404
+    try:
+        duration = datetime.timedelta(minutes=current_app.config['MATCH_DURATION_MINUTES'])
+        assignments = assign_referees(matches, duration)
+        db.session.commit()
+    except ValueError:
+        db.session.rollback()
+        response_object['message'] = 'Not enough referees available'
+        return jsonify(response_object), 400
+    except exc.IntegrityError as e:
+        db.session.rollback()
+        response_object['message'] = 'Referee double booked'
+        return jsonify(response_object), 400
+    response_object = {
+        'status': 'success',
+        'message': f'{len(assignments)} referees assigned',
+        'data': {
+            'assignments': [{'match': match_id, 'referee': referee_id}
+                            for match_id, referee_id in assignments.items()]
+        }
+    }
+    return jsonify(response_object), 200
+
+
 # read
 # get single match (by ID)
 @matches_blueprint.route('/matches/<match_id>', methods=['GET'])
+@versioned('match')
 def get_single_match(match_id):
     """Get single match details"""
     response_object = {
@@ -522,14 +672,172 @@ def get_single_match(match_id):
         return jsonify(response_object), 404
 
 
+def filter_matches(query, args):
+    """
+    Apply the optional filters of the match list to a query
+    :param query: query on Match
+    :param args: request arguments (division, team, matchweek, season, from, to)
+    :return: filtered query
+    :raises ValueError: if one of the filters has an invalid value
+    """
+    division = args.get('division')
+    if division is not None:
+        query = query.filter(Match.division_id == int(division))
+    team = args.get('team')
+    if team is not None:
+        team = int(team)
+        query = query.filter(or_(Match.home_team_id == team, Match.away_team_id == team))
+    matchweek = args.get('matchweek')
+    if matchweek is not None:
+        query = query.filter(Match.matchweek == int(matchweek))
+    season = args.get('season')
+    if season is not None:
+        # only the partition of the season is scanned
+        query = query.filter(Match.season == parse_season(season))
+    date_from = args.get('from')
+    if date_from is not None:
+        query = query.filter(Match.date >= datetime.datetime.strptime(date_from, '%Y-%m-%d').date())
+    date_to = args.get('to')
+    if date_to is not None:
+        query = query.filter(Match.date <= datetime.datetime.strptime(date_to, '%Y-%m-%d').date())
+    return query
+
+
 # get all matches
 @matches_blueprint.route('/matches', methods=['GET'])
+@versioned('match')
 def get_all_matches():
-    """Get all matches"""
+    """Get all matches, optionally filtered on division, team, matchweek, season and date range"""
+    try:
+        query = filter_matches(Match.query, request.args)
+    except ValueError:
+        response_object = {
+            'status': 'fail',
+            'message': 'Invalid filter.'
+        }
+        return jsonify(response_object), 400
+    return list_response(query, Match.id, 'matches')
+
+
+# live feed of match changes
+@matches_blueprint.route('/matches/stream', methods=['GET'])
+def stream_matches():
+    """Server-sent events for every added, updated or deleted match"""
+    try:
+        # every open stream holds a worker thread, keep some of them for the other requests
+        subscriber = subscribe(current_app.config['EVENT_STREAMS_PER_WORKER'])
+    except TooManyStreams:
+        response_object = {
+            'status': 'fail',
+            'message': 'Too many open streams, try again later.'
+        }
+        return jsonify(response_object), 503, {'Retry-After': '30'}
+    response = Response(stream_with_context(event_stream(subscriber)), mimetype='text/event-stream')
+    # a stream closed before it started does not run the finally of the generator
+    response.call_on_close(lambda: unsubscribe(subscriber))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# columnar export of all matches
+@matches_blueprint.route('/matches/export', methods=['GET'])
+@versioned('match')
+def get_match_export():
+    """Export the matches as typed columns (?format=npz or arrow), takes the same filters as the match list"""
+    try:
+        query = filter_matches(Match.query, request.args)
+        data, mimetype = export_matches(query, request.args.get('format', 'npz'))
+    except ValueError:
+        response_object = {
+            'status': 'fail',
+            'message': 'Invalid export.'
+        }
+        return jsonify(response_object), 400
+    response = Response(data, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f"attachment; filename=matches.{request.args.get('format', 'npz')}"
+    return response
+
+
+# head-to-head statistics of two teams
+@matches_blueprint.route('/matches/head-to-head', methods=['GET'])
+@versioned('match')
+def get_head_to_head():
+    """Get the results of the played matches between two teams (?a=<team id>&b=<team id>&n=<last games>)"""
+    response_object = {
+        'status': 'fail',
+        'message': 'Invalid filter.'
+    }
+    try:
+        team_a = int(request.args.get('a'))
+        team_b = int(request.args.get('b'))
+        amount = int(request.args.get('n', 3))
+    except (ValueError, TypeError):
+        return jsonify(response_object), 400
+
+    played = and_(or_(and_(Match.home_team_id == team_a, Match.away_team_id == team_b),
+                      and_(Match.home_team_id == team_b, Match.away_team_id == team_a)),
+                  Match.goals_home_team.isnot(None), Match.goals_away_team.isnot(None))
+    home_won = Match.goals_home_team > Match.goals_away_team
+    away_won = Match.goals_home_team < Match.goals_away_team
+    times_played, wins_a, wins_b = db.session.query(
+        func.count(Match.id),
+        func.sum(case([(or_(and_(Match.home_team_id == team_a, home_won),
+                            and_(Match.away_team_id == team_a, away_won)), 1)], else_=0)),
+        func.sum(case([(or_(and_(Match.home_team_id == team_b, home_won),
+                            and_(Match.away_team_id == team_b, away_won)), 1)], else_=0))
+    ).filter(played).one()
+    last_games = Match.query.filter(played).order_by(Match.date.desc(), Match.time.desc()).limit(amount).all()
+    response_object = {
+        'status': 'success',
+        'data': {
+            'teama': team_a,
+            'teamb': team_b,
+            'played': times_played,
+            'winsa': wins_a or 0,
+            'winsb': wins_b or 0,
+            'ties': times_played - (wins_a or 0) - (wins_b or 0),
+            'lastgames': [match.to_json() for match in last_games]
+        }
+    }
+    return jsonify(response_object), 200
+
+
+def match_result(match, team_id):
+    """Result of a played match from the point of view of a team: W, D or L"""
+    goals_for, goals_against = match.goals_home_team, match.goals_away_team
+    if match.away_team_id == team_id:
+        goals_for, goals_against = goals_against, goals_for
+    if goals_for > goals_against:
+        return 'W'
+    if goals_for == goals_against:
+        return 'D'
+    return 'L'
+
+
+# form of a team
+@matches_blueprint.route('/teams/<team_id>/form', methods=['GET'])
+@versioned('match')
+def get_team_form(team_id):
+    """Get the results of the last n played matches of a team (?n=<amount>), most recent first"""
+    response_object = {
+        'status': 'fail',
+        'message': 'Invalid filter.'
+    }
+    try:
+        team_id = int(team_id)
+        amount = int(request.args.get('n', 5))
+    except ValueError:
+        return jsonify(response_object), 400
+    matches = Match.query.filter(or_(Match.home_team_id == team_id, Match.away_team_id == team_id),
+                                 Match.goals_home_team.isnot(None), Match.goals_away_team.isnot(None)).order_by(
+        Match.date.desc(), Match.time.desc()).limit(amount).all()
     response_object = {
         'status': 'success',
         'data': {
-            'matches': [match.to_json() for match in Match.query.all()]
+            'team': team_id,
+            'form': ''.join(match_result(match, team_id) for match in matches),
+            'matches': [match.to_json() for match in matches]
         }
     }
     return jsonify(response_object), 200
@@ -555,23 +863,26 @@ def update_match(match_id):
             referee = None
             if 'referee' in data:
                 referee = data.get('referee')
-            if referee is not None:
-                toCheck = Match.query.filter_by(referee=referee).all()
-                for match in toCheck:
-                    match_json = match.to_json()
-                    if match_json['date'] == data.get('date') and match_json['time'] == data.get('time'):
-                        response_object['message'] = 'Referee double booked'
-                        return jsonify(response_object), 400
+            date = datetime.datetime.strptime(data.get('date'), '%Y-%m-%d').date()
+            time = datetime.datetime.strptime(data.get('time'), '%H:%M:%S').time()
+            if referee is not None and referee_double_booked(referee, date, time, match.id):
+                response_object['message'] = 'Referee double booked'
+                return jsonify(response_object), 400
+            old_state = match_state(match)
             match.division = data.get('division')
             match.matchweek = data.get('matchweek')
-            match.date = datetime.datetime.strptime(data.get('date'), '%Y-%m-%d')
-            match.time = datetime.datetime.strptime(data.get('time'), '%H:%M:%S')
+            match.date = date
+            match.time = time
             match.hometeam = data.get('hometeam')
             match.awayteam = data.get('awayteam')
             match.goals_home_team = int(data.get('goalshome'))
             match.goals_away_team = int(data.get('goalsaway'))
             match.status = data.get('status')
             match.referee = referee
+            apply_match(*old_state, sign=-1)
+            apply_match(*match_state(match))
+            db.session.flush()
+            queue_event('update', match)
             db.session.commit()
             response_object = {
                 'status': 'success',
@@ -583,6 +894,8 @@ def update_match(match_id):
     except exc.IntegrityError as e:
         db.session.rollback()
         response_object['message'] = 'Invalid input data'
+        if referee is not None and referee_double_booked(referee, date, time, int(match_id)):
+            response_object['message'] = 'Referee double booked'
         return jsonify(response_object), 400
 
 
@@ -599,7 +912,10 @@ def delete_match(match_id):
         if not match:
             return jsonify(response_object), 404
         else:
+            state = match_state(match)
+            queue_event('delete', match.id)
             Match.query.filter_by(id=int(match_id)).delete()
+            apply_match(*state, sign=-1)
             db.session.commit()
             response_object = {
                 'status': 'success',
@@ -612,3 +928,118 @@ def delete_match(match_id):
         db.session.rollback()
         response_object['message'] = 'Failed to delete match'
         return jsonify(response_object), 400
+
+
+# batch
+@matches_blueprint.route('/matches/batch', methods=['POST'])
+def batch_matches():
+    """Create, update and delete matches in one transaction, see project.api.batch"""
+    try:
+        operations = parse_operations(request.get_json(silent=True))
+    except ValueError:
+        response_object = {
+            'status': 'fail',
+            'message': 'Invalid payload.'
+        }
+        return jsonify(response_object), 400
+    parsers = {'date': parse_date, 'time': parse_time}
+
+    def create(data):
+        match = Match(**from_json(Match, data, parsers, exclude=('id', 'season')))
+        if match.referee is not None and referee_double_booked(match.referee, match.date, match.time):
+            raise BatchItemError('Referee double booked')
+        db.session.add(match)
+        apply_match(*match_state(match))
+        db.session.flush()
+        queue_event('add', match)
+        return match
+
+    def update(match_id, data):
+        match = Match.query.get(match_id)
+        if not match:
+            raise BatchItemError('Match does not exist')
+        old_state = match_state(match)
+        for attribute, value in from_json(Match, data, parsers, exclude=('id', 'season')).items():
+            setattr(match, attribute, value)
+        if match.referee is not None and referee_double_booked(match.referee, match.date, match.time, match.id):
+            raise BatchItemError('Referee double booked')
+        apply_match(*old_state, sign=-1)
+        apply_match(*match_state(match))
+        db.session.flush()
+        queue_event('update', match)
+
+    def delete(match_ids):
+        rows = delete_returning(Match, match_ids, Match.division_id, Match.date, Match.home_team_id,
+                                Match.away_team_id, Match.goals_home_team, Match.goals_away_team)
+        for match_id, *state in rows:
+            apply_match(*state, sign=-1)
+            queue_event('delete', match_id)
+        return {match_id for match_id, *state in rows}
+
+    return run_batch(operations, create, update, delete)
+
+
+### REFERENCE ###
+# read
+# get all lookup tables at once
+@matches_blueprint.route('/reference', methods=['GET'])
+@versioned('division', 'status')
+def get_reference():
+    """Get all divisions and status in one response, cacheable with its ETag"""
+    response_object = {
+        'status': 'success',
+        'data': {
+            'divisions': reference_rows('divisions'),
+            'status': reference_rows('status')
+        }
+    }
+    return jsonify(response_object), 200
+
+
+### STANDINGS ###
+# read
+# get league table of a division in a season
+@matches_blueprint.route('/standings', methods=['GET'])
+@versioned('standing')
+def get_standings():
+    """Get the league table of a division in a season (?division=<id>&season=<2018-2019>)"""
+    response_object = {
+        'status': 'fail',
+        'message': 'Invalid filter.'
+    }
+    try:
+        division = int(request.args.get('division'))
+        season = parse_season(request.args.get('season'))
+    except (ValueError, TypeError):
+        return jsonify(response_object), 400
+    standings = Standing.query.filter_by(division_id=division, season=season).order_by(
+        Standing.points.desc(), (Standing.goals_for - Standing.goals_against).desc(), Standing.goals_for.desc(),
+        Standing.team_id).all()
+    response_object = {
+        'status': 'success',
+        'data': {
+            'standings': [standing.to_json() for standing in standings]
+        }
+    }
+    return jsonify(response_object), 200
+
+
+# season statistics of a division
+@matches_blueprint.route('/statistics', methods=['GET'])
+@versioned('match')
+def get_statistics():
+    """Get the per-team statistics of a division in a season (?division=<id>&season=<2018-2019>)"""
+    response_object = {
+        'status': 'fail',
+        'message': 'Invalid filter.'
+    }
+    try:
+        division = int(request.args.get('division'))
+        season = parse_season(request.args.get('season'))
+    except (ValueError, TypeError):
+        return jsonify(response_object), 400
+    response_object = {
+        'status': 'success',
+        'data': season_statistics(division, season)
+    }
+    return jsonify(response_object), 200
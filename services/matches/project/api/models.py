@@ -1,8 +1,11 @@
 # services/matches/project/api/models.py
 
 
+from sqlalchemy.orm import validates
 from sqlalchemy.sql import func
 from project import db
+from project.api.partitions import partitioned
+from project.api.seasons import season_of
 
 class Referee(db.Model):
     __tablename__ = 'referee'
@@ -17,6 +20,19 @@ class Referee(db.Model):
     email = db.Column(db.String(128), nullable=False)
     birth_date = db.Column(db.Date, nullable=False)
 
+    # json key -> column attribute, used for ?fields= projections
+    JSON_FIELDS = {
+        'id': 'id',
+        'firstname': 'first_name',
+        'lastname': 'last_name',
+        'address': 'address',
+        'zipcode': 'zip_code',
+        'city': 'city',
+        'phonenumber': 'phone_number',
+        'email': 'email',
+        'birthdate': 'birth_date'
+    }
+
     def __init__(self, first_name, last_name, address, zip_code, city, phone_number, email, birth_date):
         self.first_name = first_name
         self.last_name = last_name
@@ -46,6 +62,12 @@ class Division(db.Model):
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     division_name = db.Column(db.String(128), nullable=False)
 
+    # json key -> column attribute, used for ?fields= projections
+    JSON_FIELDS = {
+        'id': 'id',
+        'divisionname': 'division_name'
+    }
+
     def __init__(self, division_name):
         self.division_name = division_name
 
@@ -61,6 +83,12 @@ class Status(db.Model):
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     status_name = db.Column(db.String(128), nullable=False)
 
+    # json key -> column attribute, used for ?fields= projections
+    JSON_FIELDS = {
+        'id': 'id',
+        'statusname': 'status_name'
+    }
+
     def __init__(self, status_name):
         self.status_name = status_name
 
@@ -72,6 +100,22 @@ class Status(db.Model):
 
 class Match(db.Model):
     __tablename__ = 'match'
+    __table_args__ = (
+        # indexes backing the filters of GET /matches
+        db.Index('ix_match_division_date', 'division_id', 'date'),
+        db.Index('ix_match_division_matchweek', 'division_id', 'matchweek'),
+        db.Index('ix_match_home_team_date', 'home_team_id', 'date'),
+        db.Index('ix_match_away_team_date', 'away_team_id', 'date'),
+        # head-to-head lookups probe the pair in both orders
+        db.Index('ix_match_team_pair', 'home_team_id', 'away_team_id', 'date'),
+        # a referee can only be booked once per kickoff, also used for the double booking check
+        # unique indexes of a partitioned table include the partition key
+        db.Index('ix_match_referee_kickoff', 'referee', 'date', 'time', 'season', unique=True,
+                 postgresql_where=db.text('referee IS NOT NULL'), sqlite_where=db.text('referee IS NOT NULL')),
+        db.Index('ix_match_season_division', 'season', 'division_id'),
+        # on postgres every season is a partition of its own, see partitions.py
+        {'info': partitioned('season', derived_from=('date', season_of))}
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     division_id = db.Column(db.Integer, db.ForeignKey(Division.id), nullable=False)
@@ -84,6 +128,25 @@ class Match(db.Model):
     goals_away_team = db.Column(db.Integer, nullable=True)
     status = db.Column(db.Integer, db.ForeignKey(Status.id, ondelete='SET NULL'), nullable=True)
     referee = db.Column(db.Integer, db.ForeignKey(Referee.id, ondelete='SET NULL'), default=None, nullable=True)
+    # start year of the season of the date, inserts without a season compute it from the date
+    season = db.Column(db.Integer, nullable=False,
+                       default=lambda context: season_of(context.get_current_parameters()['date']))
+
+    # json key -> column attribute, used for ?fields= projections
+    JSON_FIELDS = {
+        'id': 'id',
+        'division': 'division_id',
+        'matchweek': 'matchweek',
+        'date': 'date',
+        'time': 'time',
+        'hometeam': 'home_team_id',
+        'awayteam': 'away_team_id',
+        'goalshome': 'goals_home_team',
+        'goalsaway': 'goals_away_team',
+        'status': 'status',
+        'referee': 'referee',
+        'season': 'season'
+    }
 
     def __init__(self, division_id, matchweek, date, time, home_team_id, away_team_id, goals_home_team,
                  goals_away_team, status, referee=None):
@@ -110,5 +173,58 @@ class Match(db.Model):
             'goalshome': self.goals_home_team,
             'goalsaway': self.goals_away_team,
             'status': self.status,
-            'referee': self.referee
-        }
\ No newline at end of file
+            'referee': self.referee,
+            'season': self.season
+        }
+
+    @validates('date')
+    def validate_date(self, key, date):
+        """Keep the season in step with the date, on postgres the row moves to the partition of its new season"""
+        self.season = season_of(date)
+        return date
+
+
+class Standing(db.Model):
+    __tablename__ = 'standing'
+
+    division_id = db.Column(db.Integer, db.ForeignKey(Division.id, ondelete='CASCADE'), primary_key=True)
+    season = db.Column(db.Integer, primary_key=True)
+    team_id = db.Column(db.Integer, primary_key=True)
+    played = db.Column(db.Integer, default=0, nullable=False)
+    win = db.Column(db.Integer, default=0, nullable=False)
+    tie = db.Column(db.Integer, default=0, nullable=False)
+    loss = db.Column(db.Integer, default=0, nullable=False)
+    goals_for = db.Column(db.Integer, default=0, nullable=False)
+    goals_against = db.Column(db.Integer, default=0, nullable=False)
+    clean_sheets = db.Column(db.Integer, default=0, nullable=False)
+    points = db.Column(db.Integer, default=0, nullable=False)
+
+    def __init__(self, division_id, season, team_id, played=0, win=0, tie=0, loss=0, goals_for=0, goals_against=0,
+                 clean_sheets=0, points=0):
+        self.division_id = division_id
+        self.season = season
+        self.team_id = team_id
+        self.played = played
+        self.win = win
+        self.tie = tie
+        self.loss = loss
+        self.goals_for = goals_for
+        self.goals_against = goals_against
+        self.clean_sheets = clean_sheets
+        self.points = points
+
+    def to_json(self):
+        return {
+            'division': self.division_id,
+            'season': self.season,
+            'team': self.team_id,
+            'played': self.played,
+            'win': self.win,
+            'tie': self.tie,
+            'loss': self.loss,
+            'goalsfor': self.goals_for,
+            'goalsagainst': self.goals_against,
+            'goaldifference': self.goals_for - self.goals_against,
+            'cleansheets': self.clean_sheets,
+            'points': self.points
+        }
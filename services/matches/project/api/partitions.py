@@ -0,0 +1,143 @@
+# services/matches/project/api/partitions.py
+# declarative list partitioning on postgres, one partition per value of the key plus a default partition
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.schema import CreateTable, Table
+
+PARTITION_KEY = 'partition_by'  # table info: name of the partition key column
+DERIVED_KEY = 'derived'  # table info: column -> (source column, function), for loaders that leave it out
+
+
+def partitioned(column, derived_from=None):
+    """
+    Table info of a table that is list partitioned on postgres, other databases get a plain table
+    :param column: name of the integer partition key column, on postgres it joins the primary key
+    :param derived_from: (source column, function) computing the key from another column of the row
+    """
+    info = {PARTITION_KEY: column}
+    if derived_from is not None:
+        info[DERIVED_KEY] = {column: derived_from}
+    return info
+
+
+@compiles(CreateTable, 'postgresql')
+def create_partitioned_table(create, compiler, **kw):
+    """Add the partition key to the primary key and PARTITION BY LIST to the partitioned tables"""
+    sql = compiler.visit_create_table(create, **kw)
+    table = create.element
+    column = table.info.get(PARTITION_KEY)
+    if column is None:
+        return sql
+    column = compiler.preparer.quote(column)
+    primary_key = compiler.process(table.primary_key)
+    sql = sql.replace(primary_key, f'{primary_key[:-1]}, {column})', 1)
+    return f'{sql.rstrip()} PARTITION BY LIST ({column})\n\n'
+
+
+def partition_name(table, value):
+    return f'{table.name}_{value}'
+
+
+def default_partition(table):
+    return f'{table.name}_default'
+
+
+@event.listens_for(Table, 'after_create')
+def create_default_partition(table, connection, **kw):
+    """Rows without a partition of their own land in the default partition"""
+    if table.info.get(PARTITION_KEY) and connection.dialect.name == 'postgresql':
+        connection.execute(f'CREATE TABLE {default_partition(table)} PARTITION OF {table.name} DEFAULT')
+
+
+def partitions(connection, table):
+    """Names of the partitions attached to a table, empty if it is not partitioned"""
+    if connection.dialect.name != 'postgresql':
+        return []
+    return [name for name, in connection.execute(text(
+        'SELECT child.relname FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+        'WHERE pg_inherits.inhparent = CAST(:table AS regclass) ORDER BY child.relname'), table=table.name)]
+
+
+def add_partition(connection, table, value):
+    """
+    Give a value of the partition key its own partition, its rows move out of the default partition
+    The partition is filled before it is attached, so the default partition never holds rows it may not
+    """
+    name = partition_name(table, int(value))
+    column = table.info[PARTITION_KEY]
+    connection.execute(f'CREATE TABLE {name} (LIKE {table.name} INCLUDING DEFAULTS)')
+    connection.execute(text(f'INSERT INTO {name} SELECT * FROM {default_partition(table)} WHERE {column} = :value'),
+                       value=value)
+    connection.execute(text(f'DELETE FROM {default_partition(table)} WHERE {column} = :value'), value=value)
+    connection.execute(f'ALTER TABLE {table.name} ATTACH PARTITION {name} FOR VALUES IN ({int(value)})')
+    return name
+
+
+def split_default_partition(connection, table):
+    """
+    Move every value found in the default partition to a partition of its own, e.g. after loading a season
+    :return: list of the values that got a partition, always empty on databases without partitioning
+    """
+    if connection.dialect.name != 'postgresql':
+        return []
+    column = table.info[PARTITION_KEY]
+    values = [value for value, in connection.execute(
+        f'SELECT DISTINCT {column} FROM {default_partition(table)} ORDER BY {column}')]
+    for value in values:
+        add_partition(connection, table, value)
+    return values
+
+
+def detach_partition(connection, table, value):
+    """
+    Take the partition of a value out of the table, its rows stay behind in a plain table that can be
+    dumped and dropped, or attached again
+    :return: name of the detached table
+    """
+    name = partition_name(table, int(value))
+    connection.execute(f'ALTER TABLE {table.name} DETACH PARTITION {name}')
+    return name
+
+
+def migrate_to_partitions(connection, table, expression):
+    """
+    Rebuild a table created before it was partitioned, the partition key is computed for the existing rows
+    :param expression: SQL expression computing the partition key from the other columns
+    :return: list of the values that got a partition
+    """
+    column = table.info[PARTITION_KEY]
+    inspector = inspect(connection)
+    if column in (existing['name'] for existing in inspector.get_columns(table.name)):
+        raise ValueError(f'Table {table.name} already has a {column} column')
+    expression = expression.compile(dialect=connection.dialect, compile_kwargs={'literal_binds': True})
+
+    if connection.dialect.name != 'postgresql':
+        # nothing to partition, only add and fill the column
+        connection.execute(f'ALTER TABLE {table.name} ADD COLUMN {column} INTEGER')
+        connection.execute(f'UPDATE {table.name} SET {column} = {expression}')
+        return []
+
+    # keep the old table aside, its index and sequence names are needed by the new table
+    old = f'{table.name}_unpartitioned'
+    connection.execute(f'ALTER TABLE {table.name} RENAME TO {old}')
+    index_names = [index['name'] for index in inspector.get_indexes(old)]
+    index_names.append(inspector.get_pk_constraint(old)['name'])
+    for index_name in index_names:
+        connection.execute(f'ALTER INDEX {index_name} RENAME TO {index_name}_unpartitioned')
+    for primary_key in table.primary_key.columns:
+        sequence = connection.execute(text('SELECT pg_get_serial_sequence(:table, :column)'), table=old,
+                                      column=primary_key.name).scalar()
+        if sequence is not None:
+            connection.execute(f'ALTER SEQUENCE {sequence} RENAME TO {old}_{primary_key.name}_seq')
+
+    table.create(connection)
+    columns = ', '.join(existing.name for existing in table.columns if existing.name != column)
+    connection.execute(f'INSERT INTO {table.name} ({columns}, {column}) SELECT {columns}, {expression} FROM {old}')
+    for primary_key in table.primary_key.columns:
+        # the copied ids were not taken from the new sequence, setval of a column without one is NULL
+        connection.execute(text(f'SELECT setval(pg_get_serial_sequence(:table, :column), '
+                                f'COALESCE(MAX({primary_key.name}), 0) + 1, false) FROM {table.name}'),
+                           table=table.name, column=primary_key.name)
+    connection.execute(f'DROP TABLE {old}')
+    return split_default_partition(connection, table)
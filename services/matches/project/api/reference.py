@@ -0,0 +1,71 @@
+# services/matches/project/api/reference.py
+# process cache of the small lookup tables (divisions and status)
+
+import threading
+
+from sqlalchemy import event
+
+from project import db
+from project.api.models import Division, Status
+from project.api.routing import primary
+from project.api.versions import TableVersion
+
+REFERENCE_TABLES = {
+    'divisions': Division,
+    'status': Status
+}
+
+_lock = threading.Lock()
+_cache = {}  # name -> (version of the table, rows)
+
+
+def table_version(model):
+    """Current version of a table, bumped by every write to it from any process"""
+    return db.session.query(TableVersion.version).filter_by(table_name=model.__tablename__).scalar() or 0
+
+
+def reference_rows(name):
+    """
+    Rows of a lookup table as json, served from the process cache while the version of the table is unchanged
+    Only the version is read on every call, so writes by other workers or manage.py are picked up right away
+    :param name: 'divisions' or 'status'
+    :return: list of dicts ordered by id
+    """
+    model = REFERENCE_TABLES[name]
+    # a lagging replica would serve old rows under the version of the primary
+    with primary(db.session):
+        version = table_version(model)
+        cached = _cache.get(name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        # rows written after the version was read are cached under the old version, the next call reloads them
+        rows = [row.to_json() for row in model.query.order_by(model.id)]
+    with _lock:
+        _cache[name] = (version, rows)
+    return rows
+
+
+def reference_row(name, row_id):
+    """Single row of a lookup table by id, None if it does not exist"""
+    for row in reference_rows(name):
+        if row['id'] == row_id:
+            return row
+    return None
+
+
+def invalidate(name):
+    """Drop a lookup table from the cache"""
+    with _lock:
+        _cache.pop(name, None)
+
+
+def _invalidate_on_ddl(name):
+    """Recreating the tables (recreate-db, tests) starts the versions from 0 again, so the cache is emptied"""
+    def listener(target, connection, **kw):
+        invalidate(name)
+    for model_event in ('after_create', 'after_drop'):
+        event.listen(REFERENCE_TABLES[name].__table__, model_event, listener)
+
+
+for _name in REFERENCE_TABLES:
+    _invalidate_on_ddl(_name)
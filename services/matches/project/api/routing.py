@@ -0,0 +1,70 @@
+# services/matches/project/api/routing.py
+# sends the reads of GET requests to the read replicas, everything else to the primary
+
+import contextlib
+import random
+
+from flask import current_app, has_request_context, request
+from flask_sqlalchemy import SQLAlchemy, SignallingSession, get_state
+from sqlalchemy import orm
+
+REPLICA_PREFIX = 'replica'  # bind keys of the replicas in SQLALCHEMY_BINDS
+PRIMARY_KEY = 'read_primary'  # session info flag that sends the reads to the primary
+STICKY_COOKIE = 'read_primary'  # set after a write, the client reads its own writes from the primary
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def replicas(app):
+    """Bind keys of the configured replicas"""
+    return sorted(key for key in app.config.get('SQLALCHEMY_BINDS') or {} if key.startswith(REPLICA_PREFIX))
+
+
+class RoutingSession(SignallingSession):
+    """Session that reads from a replica while it serves a GET request that did not just follow a write"""
+
+    def get_bind(self, mapper=None, clause=None):
+        bind_key = self.replica(mapper)
+        if bind_key is not None:
+            return get_state(self.app).db.get_engine(self.app, bind=bind_key)
+        return super().get_bind(mapper, clause)
+
+    def replica(self, mapper):
+        """Bind key of the replica of this session, None if the primary has to be used"""
+        if (self._flushing or self.info.get(PRIMARY_KEY) or not has_request_context() or
+                request.method not in READ_METHODS or STICKY_COOKIE in request.cookies):
+            return None
+        if mapper is not None and mapper.persist_selectable.info.get('bind_key') is not None:
+            return None
+        if 'replica' not in self.info:
+            # one replica per session, so a request sees a single consistent snapshot
+            keys = replicas(self.app)
+            self.info['replica'] = random.choice(keys) if keys else None
+        return self.info['replica']
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+@contextlib.contextmanager
+def primary(session):
+    """Read from the primary inside the block, for reads that must not lag behind the writes"""
+    previous = session.info.get(PRIMARY_KEY)
+    session.info[PRIMARY_KEY] = True
+    try:
+        yield session
+    finally:
+        session.info[PRIMARY_KEY] = previous
+
+
+def sticky_primary(response):
+    """After a successful write the client reads from the primary until the replicas have caught up"""
+    if request.method not in READ_METHODS and response.status_code < 400 and replicas(current_app):
+        response.set_cookie(STICKY_COOKIE, '1', max_age=current_app.config['REPLICA_STICKY_SECONDS'],
+                            httponly=True)
+    return response
+
+
+def init_routing(app):
+    app.after_request(sticky_primary)
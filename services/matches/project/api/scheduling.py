@@ -0,0 +1,95 @@
+# services/matches/project/api/scheduling.py
+# round-robin fixture schedule generation
+
+import datetime
+
+from project import db
+from project.api.models import Match, Standing
+from project.api.seasons import season_bounds
+
+DEFAULT_KICKOFF = datetime.time(14, 30)
+SATURDAY = 5
+
+
+def round_robin(teams):
+    """
+    Pair the teams with the circle method (Berger tables), every team meets every other team once
+    The orientation of a pair alternates along the circle, so while a team moves around it alternates between
+    home and away and plays at most two home or two away matches in a row
+    :param teams: list of team ids
+    :return: list of rounds, each a list of (home, away) pairs
+    """
+    teams = list(teams)
+    if len(teams) % 2:
+        teams.insert(0, None)  # the team paired with None has a bye, None stays in place
+    rounds = []
+    for week in range(len(teams) - 1):
+        pairs = []
+        for i in range(len(teams) // 2):
+            home, away = teams[i], teams[-1 - i]
+            # the fixed team alternates every week, the other pairs by their place on the circle
+            if (week if i == 0 else i) % 2:
+                home, away = away, home
+            if home is not None and away is not None:
+                pairs.append((home, away))
+        rounds.append(pairs)
+        teams.insert(1, teams.pop())
+    return rounds
+
+
+def double_round_robin(teams):
+    """
+    Every team meets every other team once at home and once away, the second half mirrors the first
+    The mirrored rounds start from the second round and end with the first, mirroring the first round right
+    after the last would give three home or away matches in a row at the turn of the season
+    """
+    first_half = round_robin(teams)
+    second_half = [[(away, home) for home, away in pairs] for pairs in first_half]
+    return first_half + second_half[1:] + second_half[:1]
+
+
+def season_start(season):
+    """First saturday of the season"""
+    begin_season, _ = season_bounds(season)
+    return begin_season + datetime.timedelta(days=(SATURDAY - begin_season.weekday()) % 7)
+
+
+def create_schedule(division_id, season, teams, start=None, kickoff=DEFAULT_KICKOFF, interval=7):
+    """
+    Add a double round-robin season for a division, one matchweek every interval days
+    The caller commits, so the whole season is written in one transaction
+    :param division_id: id of the division
+    :param season: start year of the season
+    :param teams: list of team ids
+    :param start: date of the first matchweek, defaults to the first saturday of the season
+    :param kickoff: kickoff time of every match
+    :param interval: days between two matchweeks
+    :return: number of matches added
+    :raises ValueError: if there are less than two teams, a team is listed twice or the matchweeks do not
+                        fit in the season
+    """
+    if len(teams) < 2 or len(set(teams)) != len(teams):
+        raise ValueError(f'Invalid teams: {teams}')
+    if start is None:
+        start = season_start(season)
+    begin_season, end_season = season_bounds(season)
+    if not begin_season <= start <= end_season:
+        raise ValueError(f'Start {start} is not in season {season}')
+
+    matches = []
+    for matchweek, pairs in enumerate(double_round_robin(teams), 1):
+        date = start + datetime.timedelta(days=(matchweek - 1) * interval)
+        for home, away in pairs:
+            matches.append({'division_id': division_id, 'matchweek': matchweek, 'date': date, 'time': kickoff,
+                            'home_team_id': home, 'away_team_id': away, 'goals_home_team': None,
+                            'goals_away_team': None, 'status': None, 'referee': None, 'season': season})
+    if date > end_season:
+        raise ValueError(f'Matchweek {matchweek} on {date} is not in season {season}')
+    db.session.bulk_insert_mappings(Match, matches)
+
+    # every scheduled team gets a (still empty) row in the league table
+    existing = {team_id for team_id, in db.session.query(Standing.team_id).filter_by(division_id=division_id,
+                                                                                     season=season)}
+    db.session.bulk_insert_mappings(Standing, [{'division_id': division_id, 'season': season, 'team_id': team_id}
+                                               for team_id in teams if team_id not in existing])
+    return len(matches)
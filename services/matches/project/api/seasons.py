@@ -0,0 +1,40 @@
+# services/matches/project/api/seasons.py
+# helpers for the league season window (1 september - 31 august)
+
+import datetime
+
+from sqlalchemy import Integer, case, cast, extract
+
+
+def season_of(date):
+    """Start year of the season the given date belongs to"""
+    if isinstance(date, str):
+        date = datetime.datetime.strptime(date, '%Y-%m-%d').date()
+    return date.year if date.month >= 9 else date.year - 1
+
+
+def season_bounds(season):
+    """First and last day of the season starting in the given year"""
+    return datetime.date(season, 9, 1), datetime.date(season + 1, 8, 31)
+
+
+def season_label(season):
+    """Human readable name of a season, e.g. 2018 -> '2018-2019'"""
+    return f'{season}-{season + 1}'
+
+
+def parse_season(value):
+    """
+    Parse a season given as '2018-2019' or '2018' into its start year
+    :raises ValueError: if the value is not a valid season
+    """
+    years = [int(year) for year in str(value).split('-')]
+    if len(years) > 2 or (len(years) == 2 and years[1] != years[0] + 1):
+        raise ValueError(f'Invalid season: {value}')
+    return years[0]
+
+
+def season_expression(date):
+    """SQL expression of season_of, for computing the season of the stored matches in the database"""
+    year = cast(extract('year', date), Integer)
+    return case([(extract('month', date) >= 9, year)], else_=year - 1)
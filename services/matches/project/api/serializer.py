@@ -0,0 +1,23 @@
+# services/matches/project/api/serializer.py
+# json serialization of query rows, uses orjson when it is installed
+
+import json
+
+try:
+    import orjson
+except ImportError:  # fall back to the standard library
+    orjson = None
+
+
+def _default(value):
+    """Dates and times as iso strings, like orjson does natively"""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps(obj):
+    """Serialize to compact json bytes, date and time values are formatted as iso strings"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, default=_default, separators=(',', ':')).encode()
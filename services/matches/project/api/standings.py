@@ -0,0 +1,127 @@
+# services/matches/project/api/standings.py
+# incremental maintenance of the league standings
+
+from sqlalchemy import exc, or_
+from sqlalchemy.dialects import postgresql
+
+from project import db
+from project.api.models import Standing, Match
+from project.api.seasons import season_of
+
+WIN_POINTS = 3
+TIE_POINTS = 1
+
+
+def result_delta(goals_for, goals_against, sign=1):
+    """
+    Changes to a team's standing caused by one match result
+    :param goals_for: goals scored by the team
+    :param goals_against: goals conceded by the team
+    :param sign: 1 to add the result, -1 to take it back
+    :return: dict of column -> delta
+    """
+    win = int(goals_for > goals_against)
+    tie = int(goals_for == goals_against)
+    return {
+        'played': sign,
+        'win': sign * win,
+        'tie': sign * tie,
+        'loss': sign * (1 - win - tie),
+        'goals_for': sign * goals_for,
+        'goals_against': sign * goals_against,
+        'clean_sheets': sign * int(goals_against == 0),
+        'points': sign * (WIN_POINTS * win + TIE_POINTS * tie)
+    }
+
+
+def apply_delta(division_id, season, team_id, delta):
+    """
+    Add a delta to a team's standing with a single statement, creating the row if it does not exist yet
+    Two transactions can create the same row at once: postgres resolves that with ON CONFLICT, elsewhere
+    the losing insert is rolled back to a savepoint and the delta applied with an UPDATE
+    """
+    if db.session.get_bind().dialect.name == 'postgresql':
+        table = Standing.__table__
+        statement = postgresql.insert(table).values(division_id=division_id, season=season, team_id=team_id,
+                                                    **delta)
+        key = [column.name for column in table.primary_key]
+        if delta:
+            statement = statement.on_conflict_do_update(index_elements=key, set_={
+                column: table.c[column] + statement.excluded[column] for column in delta})
+        else:
+            statement = statement.on_conflict_do_nothing(index_elements=key)
+        db.session.execute(statement)
+        return
+    if update_delta(division_id, season, team_id, delta):
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(Standing(division_id, season, team_id, **delta))
+    except exc.IntegrityError:
+        # created by a concurrent transaction since the update
+        update_delta(division_id, season, team_id, delta)
+
+
+def update_delta(division_id, season, team_id, delta):
+    """Add a delta to an existing standing, False if the team has no standing yet"""
+    query = Standing.query.filter_by(division_id=division_id, season=season, team_id=team_id)
+    if not delta:
+        return db.session.query(query.exists()).scalar()
+    return bool(query.update({getattr(Standing, column): getattr(Standing, column) + value
+                              for column, value in delta.items()}, synchronize_session=False))
+
+
+def apply_match(division_id, date, home_team_id, away_team_id, goals_home_team, goals_away_team, sign=1):
+    """
+    Add (sign=1) or take back (sign=-1) a match in the standings, must be called in the transaction
+    that writes the match, after the match is deleted or changed when taking it back. Both teams get a row,
+    played or not, so they show up in the league table.
+    """
+    season = season_of(date)
+    if goals_home_team is None or goals_away_team is None:
+        home_delta = away_delta = {}
+    else:
+        home_delta = result_delta(int(goals_home_team), int(goals_away_team), sign)
+        away_delta = result_delta(int(goals_away_team), int(goals_home_team), sign)
+    apply_delta(int(division_id), season, int(home_team_id), home_delta)
+    apply_delta(int(division_id), season, int(away_team_id), away_delta)
+    if sign < 0:
+        # the match is already deleted or moved, like rebuild_standings a team without matches has no row
+        prune_standing(int(division_id), season, int(home_team_id))
+        prune_standing(int(division_id), season, int(away_team_id))
+
+
+def prune_standing(division_id, season, team_id):
+    """Delete a team's standing once it has no match left in the division and season"""
+    matches = Match.query.filter(Match.division_id == division_id, Match.season == season,
+                                 or_(Match.home_team_id == team_id, Match.away_team_id == team_id))
+    if not db.session.query(matches.exists()).scalar():
+        Standing.query.filter_by(division_id=division_id, season=season, team_id=team_id).delete(
+            synchronize_session=False)
+
+
+def match_state(match):
+    """Snapshot of the columns of a match that determine the standings"""
+    return (match.division_id, match.date, match.home_team_id, match.away_team_id, match.goals_home_team,
+            match.goals_away_team)
+
+
+def rebuild_standings():
+    """Recompute the whole standings table from the matches in one pass"""
+    rows = {}
+    for state in db.session.query(Match.division_id, Match.season, Match.home_team_id, Match.away_team_id,
+                                  Match.goals_home_team, Match.goals_away_team):
+        division_id, season, home_team_id, away_team_id, goals_home_team, goals_away_team = state
+        for team_id, goals_for, goals_against in ((home_team_id, goals_home_team, goals_away_team),
+                                                  (away_team_id, goals_away_team, goals_home_team)):
+            row = rows.setdefault((division_id, season, team_id), dict.fromkeys(result_delta(0, 0), 0))
+            if goals_for is None or goals_against is None:
+                continue
+            for column, value in result_delta(goals_for, goals_against).items():
+                row[column] += value
+    Standing.query.delete()
+    db.session.bulk_insert_mappings(Standing, [
+        dict(division_id=division_id, season=season, team_id=team_id, **row)
+        for (division_id, season, team_id), row in rows.items()
+    ])
+    db.session.commit()
@@ -0,0 +1,69 @@
+# services/matches/project/api/statistics.py
+# per-team season statistics computed on numpy arrays
+
+import numpy as np
+
+from project import db
+from project.api.models import Match
+from project.api.standings import WIN_POINTS, TIE_POINTS
+
+
+def season_statistics(division_id, season):
+    """
+    Compute the statistics of every team of a division in a season in one vectorized pass
+    :param division_id: id of the division
+    :param season: start year of the season
+    :return: dict with the per-team statistics and the teams with the best attack, best defense and
+             most clean sheets (None when no match was played)
+    """
+    rows = db.session.query(Match.home_team_id, Match.away_team_id, Match.goals_home_team,
+                            Match.goals_away_team).filter(Match.division_id == division_id,
+                                                          Match.season == season).all()
+    # unplayed matches have NULL goals, which become nan
+    matches = np.array(rows, dtype=float).reshape(-1, 4)
+    teams, index = np.unique(matches[:, :2].astype(int), return_inverse=True)
+    index = index.reshape(-1, 2)
+    home, away = index[:, 0], index[:, 1]
+    played = ~np.isnan(matches[:, 2:]).any(axis=1)
+    goals_home = np.where(played, matches[:, 2], 0).astype(int)
+    goals_away = np.where(played, matches[:, 3], 0).astype(int)
+
+    def per_team(home_values, away_values):
+        """Sum a per-match value of the home team and of the away team per team"""
+        return (np.bincount(home, weights=home_values, minlength=len(teams)) +
+                np.bincount(away, weights=away_values, minlength=len(teams))).astype(int)
+
+    played_count = per_team(played, played)
+    win = per_team(played & (goals_home > goals_away), played & (goals_away > goals_home))
+    tie = per_team(played & (goals_home == goals_away), played & (goals_home == goals_away))
+    goals_for = per_team(goals_home, goals_away)
+    goals_against = per_team(goals_away, goals_home)
+    clean_sheets = per_team(played & (goals_away == 0), played & (goals_home == 0))
+    points = WIN_POINTS * win + TIE_POINTS * tie
+
+    columns = {
+        'team': teams,
+        'played': played_count,
+        'win': win,
+        'tie': tie,
+        'loss': played_count - win - tie,
+        'goalsfor': goals_for,
+        'goalsagainst': goals_against,
+        'goaldifference': goals_for - goals_against,
+        'cleansheets': clean_sheets,
+        'points': points
+    }
+    columns = {key: column.tolist() for key, column in columns.items()}
+    statistics = {
+        'division': division_id,
+        'season': season,
+        'teams': [dict(zip(columns, values)) for values in zip(*columns.values())],
+        'bestattack': None,
+        'bestdefense': None,
+        'mostcleansheets': None
+    }
+    if played_count.any():
+        statistics['bestattack'] = int(teams[np.argmax(goals_for)])
+        statistics['bestdefense'] = int(teams[np.argmin(np.where(played_count > 0, goals_against, np.iinfo(int).max))])
+        statistics['mostcleansheets'] = int(teams[np.argmax(clean_sheets)])
+    return statistics
@@ -0,0 +1,94 @@
+# services/matches/project/api/utils.py
+# helpers shared by the list endpoints
+
+from flask import Response, jsonify, request, stream_with_context
+
+from project.api.serializer import dumps
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+STREAM_BATCH_SIZE = 500  # rows fetched from the server-side cursor per round-trip
+
+
+def wants_ndjson():
+    """Check if the client asked for newline delimited json instead of a single document"""
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def parse_fields(model, fields):
+    """
+    Parse a ?fields= projection
+    :param model: model with a JSON_FIELDS mapping of json key -> column attribute
+    :param fields: comma separated json keys, None for all fields
+    :return: list of json keys
+    :raises ValueError: if a field does not exist
+    """
+    if fields is None:
+        return list(model.JSON_FIELDS)
+    fields = fields.split(',')
+    for field in fields:
+        if field not in model.JSON_FIELDS:
+            raise ValueError(f'Unknown field: {field}')
+    return fields
+
+
+def list_response(query, key, name):
+    """
+    Build the response of a list endpoint, supports keyset pagination (?after=<key>&limit=<n>),
+    column projection (?fields=<key>,<key>) and streaming as newline delimited json
+    (Accept: application/x-ndjson)
+    :param query: query on the listed model
+    :param key: unique column of the model used as pagination cursor
+    :param name: name of the list in the response data
+    :return: flask response
+    """
+    try:
+        after = request.args.get('after')
+        if after is not None:
+            query = query.filter(key > int(after))
+        query = query.order_by(key)
+        limit = request.args.get('limit')
+        if limit is not None:
+            limit = int(limit)
+            if limit < 1:
+                raise ValueError(limit)
+            query = query.limit(limit)
+    except ValueError:
+        response_object = {
+            'status': 'fail',
+            'message': 'Invalid pagination.'
+        }
+        return jsonify(response_object), 400
+    model = key.class_
+    try:
+        fields = parse_fields(model, request.args.get('fields'))
+    except ValueError:
+        response_object = {
+            'status': 'fail',
+            'message': 'Invalid fields.'
+        }
+        return jsonify(response_object), 400
+
+    # select only the needed columns, the key goes first for the cursor, and serialize the row tuples
+    # without loading model instances
+    query = query.with_entities(key, *(getattr(model, model.JSON_FIELDS[field]) for field in fields))
+
+    if wants_ndjson():
+        rows = query.execution_options(stream_results=True).yield_per(STREAM_BATCH_SIZE)
+
+        def generate():
+            for row in rows:
+                yield dumps(dict(zip(fields, row[1:]))) + b'\n'
+
+        return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+    rows = query.all()
+    response_object = {
+        'status': 'success',
+        'data': {
+            name: [dict(zip(fields, row[1:])) for row in rows]
+        }
+    }
+    if limit is not None and len(rows) == limit:
+        # there might be more rows, hand out the cursor of the next page
+        response_object['data']['next'] = rows[-1][0]
+    return Response(dumps(response_object), status=200, mimetype='application/json')
@@ -1,10 +1,24 @@
 # services/matches/project/tests/test_matches.py
 
+import datetime
+import io
 import json
 import unittest
 
+import numpy
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.sql import column
+
 from project import db
-from project.api.models import Referee, Division, Status, Match
+from project.api.bulk import bulk_load
+from project.api.export import pa
+from project.api.metrics import TimedQueuePool
+from project.api.models import Referee, Division, Status, Match, Standing
+from project.api.partitions import migrate_to_partitions, partitioned, partitions
+from project.api.seasons import season_expression
+from project.api.standings import rebuild_standings
 from project.tests.base import BaseTestCase
 
 
@@ -254,6 +268,29 @@ class TestMatchesService(BaseTestCase):
             self.assertIn('Referee does not exist', data['message'])
             self.assertIn('fail', data['status'])
 
+    # test batch of referee operations
+    def test_batch_referees(self):
+        """Ensure referees can be created, updated and deleted in one batch"""
+        referee = add_referee("Jan", "Peeters", "Lentestraat 5", 2000, "Antwerpen", "024771211",
+                              "jan.peeters@l-v-l.be", datetime.date(1969, 6, 9))
+        with self.client:
+            response = self.client.post('/referees/batch', data=json.dumps([
+                {'op': 'create', 'data': {'firstname': 'Piet', 'lastname': 'Janssens', 'address': 'Kerkstraat 1',
+                                          'zipcode': 2000, 'city': 'Antwerpen', 'phonenumber': '0123',
+                                          'email': 'piet@l-v-l.be', 'birthdate': '1975-01-31'}},
+                {'op': 'update', 'id': referee.id, 'data': {'city': 'Gent'}},
+            ]), content_type='application/json')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(['success', 'success'], [result['status'] for result in data['data']['results']])
+            self.assertEqual(2, data['data']['results'][0]['id'])
+            self.assertEqual(datetime.date(1975, 1, 31), Referee.query.get(2).birth_date)
+            self.assertEqual('Gent', Referee.query.get(referee.id).city)
+            response = self.client.post('/referees/batch', data=json.dumps([
+                {'op': 'delete', 'id': 1}, {'op': 'delete', 'id': 2}]), content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(0, Referee.query.count())
+
     ### Division ###
     def test_division(self):
         """Ensure the /ping route behaves correctly for divisions."""
@@ -436,6 +473,28 @@ class TestMatchesService(BaseTestCase):
             self.assertIn('fail', data['status'])
             self.assertIn('Failed to delete division: division still has existing matches', data['message'])
 
+    # test cached division
+    def test_single_division_cached(self):
+        """Ensure a cached division is refreshed after it is updated or deleted"""
+        add_division('1ste Afdeling')
+        with self.client:
+            response = self.client.get('/divisions/1')
+            data = json.loads(response.data.decode())
+            self.assertIn('1ste Afdeling', data['data']['divisionname'])
+            self.client.put('/divisions/1', data={'divisionname': '2de Afdeling'})
+            response = self.client.get('/divisions/1')
+            data = json.loads(response.data.decode())
+            self.assertIn('2de Afdeling', data['data']['divisionname'])
+            # written outside of the routes, e.g. by another worker or manage.py
+            Division.query.filter_by(id=1).update({'division_name': '3de Afdeling'})
+            db.session.commit()
+            response = self.client.get('/divisions/1')
+            data = json.loads(response.data.decode())
+            self.assertIn('3de Afdeling', data['data']['divisionname'])
+            self.client.delete('/divisions/1')
+            response = self.client.get('/divisions/1')
+            self.assertEqual(response.status_code, 404)
+
     ### Status ###
     def test_status(self):
         """Ensure the /ping route behaves correctly for status."""
@@ -606,6 +665,45 @@ class TestMatchesService(BaseTestCase):
             self.assertIn('Status does not exist', data['message'])
             self.assertIn('fail', data['status'])
 
+    ### Reference ###
+    def test_reference(self):
+        """Ensure all lookup tables are returned at once with an ETag"""
+        add_division('1ste Afdeling')
+        add_status('Forfait')
+        with self.client:
+            response = self.client.get('/reference')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([{'id': 1, 'divisionname': '1ste Afdeling'}], data['data']['divisions'])
+            self.assertEqual([{'id': 1, 'statusname': 'Forfait'}], data['data']['status'])
+            etag = response.headers['ETag']
+            response = self.client.get('/reference', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+            self.client.post('/status', data={'statusname': 'Uitgesteld'})
+            response = self.client.get('/reference', headers={'If-None-Match': etag})
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(['Forfait', 'Uitgesteld'], [status['statusname'] for status in data['data']['status']])
+
+    # test the table versions are bumped when the transaction commits
+    def test_versions_bumped_at_commit(self):
+        """Ensure the versions of the written tables are bumped at commit, in the order of their names"""
+        add_division('1ste Afdeling')
+        bumped = []
+
+        def record(connection, cursor, statement, parameters, context, executemany):
+            if statement.startswith('UPDATE table_version'):
+                bumped.append(parameters[-1])
+        event.listen(db.engine, 'before_cursor_execute', record)
+        self.addCleanup(event.remove, db.engine, 'before_cursor_execute', record)
+        db.session.add(Standing(1, 2018, 33))
+        db.session.flush()
+        db.session.add(Match(1, 1, datetime.date(2018, 9, 5), datetime.time(14, 30), 33, 67, None, None, None))
+        db.session.flush()
+        self.assertEqual([], bumped)
+        db.session.commit()
+        self.assertEqual(['match', 'standing'], bumped)
+
     ### matches ###
     # test ping
     def test_match(self):
@@ -616,6 +714,23 @@ class TestMatchesService(BaseTestCase):
         self.assertIn('pong!', data['message'])
         self.assertIn('success', data['status'])
 
+    # test pool metrics
+    def test_metrics(self):
+        """Ensure the pool metrics are served in the prometheus text format"""
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/plain')
+        self.assertIn('# pool class', response.data.decode())
+
+    def test_timed_pool(self):
+        """Ensure the timed pool counts its checkouts"""
+        engine = create_engine(db.engine.url, poolclass=TimedQueuePool, pool_size=1, max_overflow=0)
+        with engine.connect():
+            self.assertEqual(1, engine.pool.checkedout())
+        self.assertEqual(1, engine.pool.checkouts)
+        self.assertGreaterEqual(engine.pool.wait_seconds, 0)
+        engine.dispose()
+
     # test create match
     def test_add_match(self):
         """Ensure a new match can be added to the database"""
@@ -758,6 +873,206 @@ class TestMatchesService(BaseTestCase):
             self.assertEqual(None, data['data']['matches'][1]['status'])
             self.assertIn('success', data['status'])
 
+    # test filter matches
+    def test_all_matches_filtered(self):
+        """Ensure the match list can be filtered on division, team, matchweek, season and date range"""
+        add_division('1ste Afdeling')
+        add_division('2de Afdeling')
+        add_match(1, 1, datetime.date(2018, 9, 5), datetime.time(14, 30), 33, 67, 0, 0, None)
+        add_match(1, 2, datetime.date(2018, 9, 12), datetime.time(14, 30), 67, 12, 1, 0, None)
+        add_match(2, 1, datetime.date(2018, 9, 5), datetime.time(14, 30), 5, 6, 2, 2, None)
+        add_match(1, 1, datetime.date(2019, 9, 5), datetime.time(14, 30), 33, 67, 3, 1, None)
+        with self.client:
+            response = self.client.get('/matches?division=1&season=2018-2019')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(data['data']['matches']), 2)
+            response = self.client.get('/matches?team=67')
+            data = json.loads(response.data.decode())
+            self.assertEqual(len(data['data']['matches']), 3)
+            response = self.client.get('/matches?team=67&matchweek=1&from=2019-01-01')
+            data = json.loads(response.data.decode())
+            self.assertEqual(len(data['data']['matches']), 1)
+            self.assertIn('2019-09-05', data['data']['matches'][0]['date'])
+            response = self.client.get('/matches?to=2018-09-05')
+            data = json.loads(response.data.decode())
+            self.assertEqual(len(data['data']['matches']), 2)
+            self.assertIn('success', data['status'])
+
+    # test filter matches with invalid value
+    def test_all_matches_invalid_filter(self):
+        """Ensure error is thrown if a filter has an invalid value"""
+        with self.client:
+            response = self.client.get('/matches?season=2018-2020')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Invalid filter.', data['message'])
+            self.assertIn('fail', data['status'])
+
+    # test paginate matches
+    def test_all_matches_paginated(self):
+        """Ensure the match list can be paged with a cursor and streamed as newline delimited json"""
+        add_division('1ste Afdeling')
+        for matchweek in range(1, 4):
+            add_match(1, matchweek, datetime.date(2018, 9, matchweek), datetime.time(14, 30), 33, 67, 0, 0, None)
+        with self.client:
+            response = self.client.get('/matches?limit=2')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([1, 2], [match['matchweek'] for match in data['data']['matches']])
+            response = self.client.get(f"/matches?after={data['data']['next']}",
+                                       headers={'Accept': 'application/x-ndjson'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, 'application/x-ndjson')
+            matches = [json.loads(line) for line in response.data.decode().splitlines()]
+            self.assertEqual([3], [match['matchweek'] for match in matches])
+
+    def test_all_matches_fields(self):
+        """Ensure the match list only returns the requested fields"""
+        add_division('1ste Afdeling')
+        add_match(1, 1, datetime.date(2018, 9, 1), datetime.time(14, 30), 33, 67, 2, 1, None)
+        add_match(1, 2, datetime.date(2018, 9, 8), datetime.time(15, 0), 67, 33, None, None, None)
+        with self.client:
+            response = self.client.get('/matches?fields=date,time,goalshome&limit=1')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([{'date': '2018-09-01', 'time': '14:30:00', 'goalshome': 2}], data['data']['matches'])
+            self.assertEqual(1, data['data']['next'])
+            response = self.client.get('/matches?fields=id,goalsaway', headers={'Accept': 'application/x-ndjson'})
+            matches = [json.loads(line) for line in response.data.decode().splitlines()]
+            self.assertEqual([{'id': 1, 'goalsaway': 1}, {'id': 2, 'goalsaway': None}], matches)
+            response = self.client.get('/matches?fields=id,password')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Invalid fields.', data['message'])
+            self.assertIn('fail', data['status'])
+
+    def test_match_export_npz(self):
+        """Ensure the matches can be exported as typed numpy columns"""
+        add_division('1ste Afdeling')
+        add_match(1, 1, datetime.date(2018, 9, 1), datetime.time(14, 30), 33, 67, 2, 1, None)
+        add_match(1, 2, datetime.date(2019, 9, 8), datetime.time(15, 0), 67, 33, None, None, None)
+        with self.client:
+            response = self.client.get('/matches/export?format=npz&season=2018-2019')
+            self.assertEqual(response.status_code, 200)
+            columns = numpy.load(io.BytesIO(response.data))
+            self.assertEqual([1], columns['id'].tolist())
+            self.assertEqual(numpy.datetime64('2018-09-01'), columns['date'][0])
+            self.assertEqual(14 * 3600 + 30 * 60, columns['time'][0].astype(int))
+            response = self.client.get('/matches/export')
+            columns = numpy.load(io.BytesIO(response.data))
+            self.assertEqual([2, -1], columns['goalshome'].tolist())
+            self.assertEqual([-1, -1], columns['referee'].tolist())
+            # the nullable columns come with a mask of their NULLs
+            self.assertEqual([False, True], columns['goalshome_mask'].tolist())
+            self.assertEqual([False, True], columns['goalsaway_mask'].tolist())
+            self.assertEqual([True, True], columns['referee_mask'].tolist())
+            self.assertEqual([True, True], columns['status_mask'].tolist())
+            self.assertNotIn('id_mask', columns.files)
+            goals = numpy.ma.masked_array(columns['goalshome'], columns['goalshome_mask'])
+            self.assertEqual(2, goals.sum())
+            response = self.client.get('/matches/export?format=csv')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Invalid export.', data['message'])
+
+    @unittest.skipIf(pa is None, 'pyarrow is not installed')
+    def test_match_export_arrow(self):
+        """Ensure the matches can be exported as an arrow stream with real nulls"""
+        add_division('1ste Afdeling')
+        add_match(1, 1, datetime.date(2018, 9, 1), datetime.time(14, 30), 33, 67, 2, 1, None)
+        add_match(1, 2, datetime.date(2019, 9, 8), datetime.time(15, 0), 67, 33, None, None, None)
+        with self.client:
+            response = self.client.get('/matches/export?format=arrow')
+            self.assertEqual(response.status_code, 200)
+            table = pa.ipc.open_stream(response.data).read_all()
+            self.assertEqual([2, None], table.column('goalshome').to_pylist())
+            self.assertEqual([datetime.date(2018, 9, 1), datetime.date(2019, 9, 8)], table.column('date').to_pylist())
+            self.assertEqual([datetime.time(14, 30), datetime.time(15, 0)], table.column('time').to_pylist())
+
+    # test head-to-head statistics
+    def test_head_to_head(self):
+        """Ensure the head-to-head statistics of two teams are computed correctly"""
+        add_division('1ste Afdeling')
+        add_match(1, 1, datetime.date(2018, 9, 5), datetime.time(14, 30), 33, 67, 2, 0, None)
+        add_match(1, 2, datetime.date(2018, 9, 12), datetime.time(14, 30), 67, 33, 1, 0, None)
+        add_match(1, 3, datetime.date(2019, 9, 5), datetime.time(14, 30), 33, 67, 1, 1, None)
+        add_match(1, 4, datetime.date(2019, 9, 12), datetime.time(14, 30), 67, 33, None, None, None)
+        add_match(1, 5, datetime.date(2019, 9, 19), datetime.time(14, 30), 33, 12, 5, 0, None)
+        with self.client:
+            response = self.client.get('/matches/head-to-head?a=33&b=67&n=2')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(3, data['data']['played'])
+            self.assertEqual(1, data['data']['winsa'])
+            self.assertEqual(1, data['data']['winsb'])
+            self.assertEqual(1, data['data']['ties'])
+            self.assertEqual([3, 2], [match['matchweek'] for match in data['data']['lastgames']])
+            self.assertIn('success', data['status'])
+
+    # test head-to-head without teams
+    def test_head_to_head_invalid_filter(self):
+        """Ensure error is thrown if one of the teams is missing"""
+        with self.client:
+            response = self.client.get('/matches/head-to-head?a=33')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Invalid filter.', data['message'])
+            self.assertIn('fail', data['status'])
+
+    # test team form
+    def test_team_form(self):
+        """Ensure the form of a team lists its last played matches, most recent first"""
+        add_division('1ste Afdeling')
+        add_match(1, 1, datetime.date(2018, 9, 5), datetime.time(14, 30), 33, 67, 2, 0, None)
+        add_match(1, 2, datetime.date(2018, 9, 12), datetime.time(14, 30), 67, 33, 1, 0, None)
+        add_match(1, 3, datetime.date(2018, 9, 19), datetime.time(14, 30), 12, 33, 1, 1, None)
+        add_match(1, 4, datetime.date(2018, 9, 26), datetime.time(14, 30), 33, 12, None, None, None)
+        with self.client:
+            response = self.client.get('/teams/33/form?n=2')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual('DL', data['data']['form'])
+            self.assertEqual([3, 2], [match['matchweek'] for match in data['data']['matches']])
+            response = self.client.get('/teams/33/form')
+            data = json.loads(response.data.decode())
+            self.assertEqual('DLW', data['data']['form'])
+            self.assertIn('success', data['status'])
+
+    # test team form with wrong id
+    def test_team_form_no_id(self):
+        """Ensure error is thrown if the team id is not a number"""
+        with self.client:
+            response = self.client.get('/teams/blah/form')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Invalid filter.', data['message'])
+            self.assertIn('fail', data['status'])
+
+    # test conditional get
+    def test_all_matches_etag(self):
+        """Ensure the match list answers 304 while the match table is unchanged"""
+        add_division('1ste Afdeling')
+        add_match(1, 1, datetime.date(2018, 9, 5), datetime.time(14, 30), 33, 67, 0, 0, None)
+        with self.client:
+            response = self.client.get('/matches')
+            etag = response.headers['ETag']
+            self.assertEqual(response.status_code, 200)
+            response = self.client.get('/matches', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(etag, response.headers['ETag'])
+            # other tables do not invalidate the match list
+            add_status('Uitstel')
+            response = self.client.get('/matches', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+            response = self.client.delete('/matches/1')
+            self.assertEqual(response.status_code, 200)
+            response = self.client.get('/matches', headers={'If-None-Match': etag})
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(etag, response.headers['ETag'])
+            self.assertEqual(0, len(data['data']['matches']))
+
     # test update match
     def test_update_match(self):
         """Ensure a match can be updated in the database"""
@@ -817,6 +1132,123 @@ class TestMatchesService(BaseTestCase):
             self.assertIn('Referee double booked', data['message'])
             self.assertIn('fail', data['status'])
 
+    # test referee double booking on overlapping kickoffs
+    def test_add_match_overlapping_referee(self):
+        """Ensure a referee cannot lead two matches that overlap, but can lead consecutive ones"""
+        add_division('1ste Afdeling')
+        referee = add_referee("Jan", "Peeters", "Lentestraat 5", 2000, "Antwerpen", "024771211", "jan.peeters@l-v-l.be",
+                              datetime.date(1969, 6, 9))
+        add_match(1, 1, datetime.date(2018, 9, 5), datetime.time(14, 30), 44, 21, None, None, None, referee.id)
+        match = {'division': 1, 'matchweek': 1, 'date': '2018-09-05', 'hometeam': 33, 'awayteam': 67,
+                 'referee': referee.id}
+        with self.client:
+            response = self.client.post('/matches', data=dict(match, time='15:30:00'))
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Referee double booked', data['message'])
+            response = self.client.post('/matches', data=dict(match, time='16:30:00'))
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 201)
+            self.assertIn('success', data['status'])
+
+    # test updating the booked match itself
+    def test_update_match_keeps_referee(self):
+        """Ensure a match can be updated without its own referee booking counting as a double booking"""
+        add_division('1ste Afdeling')
+        referee = add_referee("Jan", "Peeters", "Lentestraat 5", 2000, "Antwerpen", "024771211", "jan.peeters@l-v-l.be",
+                              datetime.date(1969, 6, 9))
+        match = add_match(1, 1, datetime.date(2018, 9, 5), datetime.time(14, 30), 33, 67, None, None, None, referee.id)
+        with self.client:
+            response = self.client.put(f'/matches/{match.id}', data={
+                'division': 1, 'matchweek': 1, 'date': '2018-09-05', 'time': '14:30:00', 'hometeam': 33,
+                'awayteam': 67, 'goalshome': 2, 'goalsaway': 1, 'referee': referee.id})
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('Match updated.', data['message'])
+            self.assertEqual(2, Match.query.get(match.id).goals_home_team)
+
+    # test the live feed of match changes
+    def test_match_stream(self):
+        """Ensure committed match changes are pushed as server-sent events"""
+        add_division('1ste Afdeling')
+        response = self.client.get('/matches/stream')
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        events = iter(response.response)
+        self.assertIn(b'retry:', next(events))
+        self.client.post('/matches', data={'division': 1, 'matchweek': 1, 'date': '2018-09-05', 'time': '14:30:00',
+                                           'hometeam': 33, 'awayteam': 67})
+        self.client.post('/matches', data={'division': 1})
+        self.client.put('/matches/1', data={'division': 1, 'matchweek': 1, 'date': '2018-09-05', 'time': '14:30:00',
+                                            'hometeam': 33, 'awayteam': 67, 'goalshome': 2, 'goalsaway': 1})
+        self.client.delete('/matches/1')
+        received = []
+        for _ in range(3):
+            event = next(events).decode()
+            self.assertTrue(event.startswith('event: match\ndata: '))
+            received.append(json.loads(event.split('data: ', 1)[1]))
+        response.close()
+        self.assertEqual(['add', 'update', 'delete'], [event['action'] for event in received])
+        self.assertEqual(33, received[0]['match']['hometeam'])
+        self.assertEqual(2, received[1]['match']['goalshome'])
+        self.assertEqual({'id': 1}, received[2]['match'])
+
+    def test_match_stream_limit(self):
+        """Ensure streams beyond the limit of a worker are refused until one closes"""
+        self.addCleanup(self.app.config.__setitem__, 'EVENT_STREAMS_PER_WORKER',
+                        self.app.config['EVENT_STREAMS_PER_WORKER'])
+        self.app.config['EVENT_STREAMS_PER_WORKER'] = 1
+        first = self.client.get('/matches/stream')
+        self.assertEqual(first.status_code, 200)
+        response = self.client.get('/matches/stream')
+        data = json.loads(response.data.decode())
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Too many open streams', data['message'])
+        self.assertIn('Retry-After', response.headers)
+        first.close()
+        response = self.client.get('/matches/stream')
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    # test assigning the referees of a matchweek
+    def test_assign_matchweek_referees(self):
+        """Ensure every match of a matchweek gets a free referee with the lowest workload"""
+        add_division('1ste Afdeling')
+        for name in ('Jan', 'Piet', 'Joris'):
+            add_referee(name, 'Peeters', 'Kerkstraat 1', 2000, 'Antwerpen', '0123456789', f'{name}@test.be',
+                        datetime.date(1980, 1, 1))
+        add_match(1, 1, datetime.date(2018, 9, 1), datetime.time(14, 30), 1, 2, 1, 0, None, 1)
+        add_match(1, 1, datetime.date(2018, 9, 1), datetime.time(14, 30), 3, 4, 1, 0, None, 2)
+        add_match(1, 1, datetime.date(2018, 9, 2), datetime.time(14, 30), 5, 6, 1, 0, None, 1)
+        add_match(1, 2, datetime.date(2018, 9, 8), datetime.time(14, 30), 2, 1, None, None, None)
+        add_match(1, 2, datetime.date(2018, 9, 8), datetime.time(15, 0), 4, 3, None, None, None)
+        add_match(1, 2, datetime.date(2018, 9, 8), datetime.time(20, 0), 6, 5, None, None, None)
+        with self.client:
+            response = self.client.post('/matchweeks/1/2/assign-referees', data={'season': '2018-2019'})
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('3 referees assigned', data['message'])
+            self.assertIn('success', data['status'])
+        self.assertEqual([3, 2, 3], [match.referee for match in
+                                     Match.query.filter_by(matchweek=2).order_by(Match.time).all()])
+
+    def test_assign_matchweek_referees_not_enough(self):
+        """Ensure no referee is assigned if not every match of the matchweek can get one"""
+        add_division('1ste Afdeling')
+        add_referee('Jan', 'Peeters', 'Kerkstraat 1', 2000, 'Antwerpen', '0123456789', 'jan@test.be',
+                    datetime.date(1980, 1, 1))
+        add_match(1, 1, datetime.date(2018, 9, 1), datetime.time(14, 30), 1, 2, None, None, None)
+        add_match(1, 1, datetime.date(2018, 9, 1), datetime.time(16, 0), 3, 4, None, None, None)
+        with self.client:
+            response = self.client.post('/matchweeks/1/1/assign-referees')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Not enough referees available', data['message'])
+            response = self.client.post('/matchweeks/1/2/assign-referees')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 404)
+            self.assertIn('Matchweek does not exist', data['message'])
+        self.assertEqual(0, Match.query.filter(Match.referee.isnot(None)).count())
+
     # test update match invalid json
     def test_update_match_invalid_json(self):
         """Ensure error is thrown if the JSON object is empty when trying to update match."""
@@ -886,6 +1318,329 @@ class TestMatchesService(BaseTestCase):
             self.assertIn('Match does not exist', data['message'])
             self.assertIn('fail', data['status'])
 
+    # test batch of match operations
+    def test_batch_matches(self):
+        """Ensure matches can be created, updated and deleted in one transaction with a result per operation"""
+        add_division('1ste Afdeling')
+        match = add_match(1, 1, datetime.date(2018, 9, 5), datetime.time(14, 30), 33, 67, None, None, None)
+        add_match(1, 1, datetime.date(2018, 9, 5), datetime.time(14, 30), 12, 5, None, None, None)
+        with self.client:
+            response = self.client.post('/matches/batch', data=json.dumps([
+                {'op': 'create', 'data': {'division': 1, 'matchweek': 2, 'date': '2018-09-12', 'time': '15:00:00',
+                                          'hometeam': 67, 'awayteam': 12, 'goalshome': 1, 'goalsaway': 1,
+                                          'status': None}},
+                {'op': 'update', 'id': match.id, 'data': {'goalshome': 3, 'goalsaway': 0}},
+                {'op': 'delete', 'id': 2},
+            ]), content_type='application/json')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('3 operations applied.', data['message'])
+            self.assertEqual([3, 1, 2], [result['id'] for result in data['data']['results']])
+        self.assertEqual([1, 3], [match.id for match in Match.query.order_by(Match.id)])
+        self.assertEqual(3, Match.query.get(1).goals_home_team)
+        points = {standing.team_id: standing.points for standing in Standing.query.filter_by(division_id=1)}
+        # 5 has no match left
+        self.assertEqual({33: 3, 67: 1, 12: 1}, points)
+
+    def test_batch_matches_invalid(self):
+        """Ensure nothing of a batch is applied if one of its operations fails"""
+        add_division('1ste Afdeling')
+        add_match(1, 1, datetime.date(2018, 9, 5), datetime.time(14, 30), 33, 67, None, None, None)
+        with self.client:
+            response = self.client.post('/matches/batch', data=json.dumps([
+                {'op': 'update', 'id': 1, 'data': {'goalshome': 3, 'goalsaway': 0}},
+                {'op': 'delete', 'id': 1},
+                {'op': 'delete', 'id': 99},
+                {'op': 'update', 'id': 1, 'data': {'goalshome': 1}},
+            ]), content_type='application/json')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Batch failed, nothing was applied.', data['message'])
+            self.assertEqual(['success', 'success', 'fail', 'skipped'],
+                             [result['status'] for result in data['data']['results']])
+            self.assertIn('Does not exist', data['data']['results'][2]['message'])
+            response = self.client.post('/matches/batch', data=json.dumps({'op': 'delete', 'id': 1}),
+                                        content_type='application/json')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Invalid payload.', data['message'])
+        self.assertEqual(None, Match.query.get(1).goals_home_team)
+
+    def test_batch_matches_season(self):
+        """Ensure the season of a match can not be written, it always follows the date"""
+        add_division('1ste Afdeling')
+        add_match(1, 1, datetime.date(2018, 9, 5), datetime.time(14, 30), 33, 67, None, None, None)
+        with self.client:
+            for operation in ({'op': 'update', 'id': 1, 'data': {'season': 2030}},
+                              {'op': 'create', 'data': {'division': 1, 'matchweek': 1, 'date': '2018-09-05',
+                                                        'time': '14:30:00', 'hometeam': 12, 'awayteam': 5,
+                                                        'season': 2030}}):
+                response = self.client.post('/matches/batch', data=json.dumps([operation]),
+                                            content_type='application/json')
+                data = json.loads(response.data.decode())
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual('fail', data['data']['results'][0]['status'])
+                self.assertIn('Invalid payload.', data['data']['results'][0]['message'])
+        self.assertEqual([2018], [match.season for match in Match.query.all()])
+
+    ### standings ###
+    # test standings follow match results
+    def test_standings(self):
+        """Ensure the standings are updated when matches are created, updated and deleted"""
+        add_division('1ste Afdeling')
+        with self.client:
+            for hometeam, awayteam, goalshome, goalsaway in ((33, 67, 2, 0), (67, 12, 1, 1), (12, 33, None, None)):
+                match = {'division': 1, 'matchweek': 1, 'date': '2018-09-05', 'time': '14:30:00',
+                         'hometeam': hometeam, 'awayteam': awayteam}
+                if goalshome is not None:
+                    match.update({'goalshome': goalshome, 'goalsaway': goalsaway})
+                response = self.client.post('/matches', data=match)
+                self.assertEqual(response.status_code, 201)
+            response = self.client.get('/standings?division=1&season=2018-2019')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([33, 12, 67], [standing['team'] for standing in data['data']['standings']])
+            self.assertEqual([3, 1, 1], [standing['points'] for standing in data['data']['standings']])
+            self.assertEqual([1, 0, 0], [standing['cleansheets'] for standing in data['data']['standings']])
+
+            # 67 now wins the first match
+            response = self.client.put('/matches/1', data={
+                'division': 1, 'matchweek': 1, 'date': '2018-09-05', 'time': '14:30:00',
+                'hometeam': 33, 'awayteam': 67, 'goalshome': 0, 'goalsaway': 3})
+            self.assertEqual(response.status_code, 200)
+            response = self.client.delete('/matches/2')
+            self.assertEqual(response.status_code, 200)
+            response = self.client.get('/standings?division=1&season=2018')
+            data = json.loads(response.data.decode())
+            standings = {standing['team']: standing for standing in data['data']['standings']}
+            self.assertEqual(3, standings[67]['points'])
+            self.assertEqual(1, standings[67]['played'])
+            self.assertEqual(3, standings[67]['goaldifference'])
+            self.assertEqual(0, standings[33]['points'])
+            self.assertEqual(1, standings[33]['loss'])
+            self.assertEqual(0, standings[12]['played'])
+            self.assertIn('success', data['status'])
+
+    # test standings of teams without matches
+    def test_standings_team_without_matches(self):
+        """Ensure a team leaves the standings of a season when its only match is deleted or moved"""
+        add_division('1ste Afdeling')
+        with self.client:
+            for hometeam, awayteam in ((1, 2), (3, 1), (1, 4)):
+                response = self.client.post('/matches', data={'division': 1, 'matchweek': 1, 'date': '2018-09-05',
+                                                              'time': '14:30:00', 'hometeam': hometeam,
+                                                              'awayteam': awayteam, 'goalshome': 1, 'goalsaway': 0})
+                self.assertEqual(response.status_code, 201)
+            response = self.client.delete('/matches/1')
+            self.assertEqual(response.status_code, 200)
+            response = self.client.put('/matches/2', data={
+                'division': 1, 'matchweek': 1, 'date': '2019-09-04', 'time': '14:30:00',
+                'hometeam': 3, 'awayteam': 1, 'goalshome': 1, 'goalsaway': 0})
+            self.assertEqual(response.status_code, 200)
+
+            def standings():
+                return {season: json.loads(self.client.get(f'/standings?division=1&season={season}').data.decode())
+                        ['data']['standings'] for season in (2018, 2019)}
+            incremental = standings()
+            self.assertEqual([1, 4], sorted(standing['team'] for standing in incremental[2018]))
+            self.assertEqual([1, 3], sorted(standing['team'] for standing in incremental[2019]))
+            rebuild_standings()
+            self.assertEqual(standings(), incremental)
+
+    # test standings without division
+    def test_standings_invalid_filter(self):
+        """Ensure error is thrown if the division or season of the standings is missing"""
+        with self.client:
+            response = self.client.get('/standings?season=2018-2019')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Invalid filter.', data['message'])
+            self.assertIn('fail', data['status'])
+
+    ### statistics ###
+    # test season statistics
+    def test_statistics(self):
+        """Ensure the season statistics of a division are computed correctly"""
+        add_division('1ste Afdeling')
+        add_match(1, 1, datetime.date(2018, 9, 1), datetime.time(14, 30), 33, 67, 2, 0, None)
+        add_match(1, 1, datetime.date(2018, 9, 1), datetime.time(14, 30), 12, 5, 1, 3, None)
+        add_match(1, 2, datetime.date(2018, 9, 8), datetime.time(14, 30), 67, 12, 1, 1, None)
+        add_match(1, 2, datetime.date(2018, 9, 8), datetime.time(14, 30), 5, 33, 0, 0, None)
+        add_match(1, 3, datetime.date(2018, 9, 15), datetime.time(14, 30), 33, 12, None, None, None)
+        add_match(1, 1, datetime.date(2019, 9, 1), datetime.time(14, 30), 33, 67, 9, 0, None)
+        with self.client:
+            response = self.client.get('/statistics?division=1&season=2018-2019')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            teams = {team['team']: team for team in data['data']['teams']}
+            self.assertEqual([5, 12, 33, 67], sorted(teams))
+            self.assertEqual([2, 2, 2, 2], [teams[team]['played'] for team in (5, 12, 33, 67)])
+            self.assertEqual([4, 1, 4, 1], [teams[team]['points'] for team in (5, 12, 33, 67)])
+            self.assertEqual([3, 2, 2, 1], [teams[team]['goalsfor'] for team in (5, 12, 33, 67)])
+            self.assertEqual([1, 4, 0, 3], [teams[team]['goalsagainst'] for team in (5, 12, 33, 67)])
+            self.assertEqual([1, 0, 2, 0], [teams[team]['cleansheets'] for team in (5, 12, 33, 67)])
+            self.assertEqual(2, teams[33]['goaldifference'])
+            self.assertEqual(5, data['data']['bestattack'])
+            self.assertEqual(33, data['data']['bestdefense'])
+            self.assertEqual(33, data['data']['mostcleansheets'])
+            response = self.client.get('/statistics?division=1&season=2020')
+            data = json.loads(response.data.decode())
+            self.assertEqual([], data['data']['teams'])
+            self.assertEqual(None, data['data']['bestattack'])
+            response = self.client.get('/statistics?division=1')
+            self.assertEqual(response.status_code, 400)
+
+    ### scheduling ###
+    # test generating a season
+    def test_add_schedule(self):
+        """Ensure a balanced double round-robin season is generated for a division"""
+        add_division('1ste Afdeling')
+        with self.client:
+            response = self.client.post('/divisions/1/schedule', data={'season': '2018-2019', 'teams': '5,12,33,67',
+                                                                       'time': '15:00:00'})
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 201)
+            self.assertIn('12 matches scheduled', data['message'])
+            self.assertIn('success', data['status'])
+        matches = Match.query.order_by(Match.id).all()
+        self.assertEqual(12, len(matches))
+        pairs = {(match.home_team_id, match.away_team_id) for match in matches}
+        self.assertEqual(12, len(pairs))
+        for matchweek in range(1, 7):
+            week = [match for match in matches if match.matchweek == matchweek]
+            teams = [team for match in week for team in (match.home_team_id, match.away_team_id)]
+            self.assertEqual([5, 12, 33, 67], sorted(teams))
+            self.assertEqual({datetime.date(2018, 9, 1) + datetime.timedelta(weeks=matchweek - 1)},
+                             {match.date for match in week})
+        for team in (5, 12, 33, 67):
+            self.assertEqual(3, len([match for match in matches if match.home_team_id == team]))
+        self.assertEqual({datetime.time(15, 0)}, {match.time for match in matches})
+        self.assertEqual(4, Standing.query.filter_by(division_id=1, season=2018).count())
+        # no team plays more than two home or two away matches in a row, also in a full size league
+        with self.client:
+            response = self.client.post('/divisions/1/schedule', data={'season': '2019-2020',
+                                                                       'teams': ','.join(map(str, range(1, 19)))})
+            self.assertEqual(response.status_code, 201)
+        for season in (2018, 2019):
+            matches = Match.query.filter_by(season=season).order_by(Match.matchweek).all()
+            for team in {match.home_team_id for match in matches}:
+                sides = ''.join('H' if match.home_team_id == team else 'A' for match in matches
+                                if team in (match.home_team_id, match.away_team_id))
+                self.assertNotIn('HHH', sides)
+                self.assertNotIn('AAA', sides)
+
+    def test_add_schedule_odd_teams(self):
+        """Ensure every team has a bye once per round when the number of teams is odd"""
+        add_division('1ste Afdeling')
+        with self.client:
+            response = self.client.post('/divisions/1/schedule', data={'season': '2018', 'teams': '1,2,3,4,5',
+                                                                       'start': '2018-09-05', 'interval': '14'})
+            self.assertEqual(response.status_code, 201)
+        matches = Match.query.all()
+        self.assertEqual(20, len(matches))
+        self.assertEqual(10, max(match.matchweek for match in matches))
+        self.assertEqual(datetime.date(2019, 1, 9), max(match.date for match in matches))
+        for team in range(1, 6):
+            self.assertEqual(8, len([match for match in matches if team in (match.home_team_id, match.away_team_id)]))
+
+    def test_add_schedule_invalid(self):
+        """Ensure error is thrown if the schedule can not be generated"""
+        add_division('1ste Afdeling')
+        add_match(1, 1, datetime.date(2018, 9, 5), datetime.time(14, 30), 33, 67, None, None, None)
+        with self.client:
+            response = self.client.post('/divisions/1/schedule', data={'season': '2018-2019', 'teams': '5,12'})
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Season already scheduled', data['message'])
+            response = self.client.post('/divisions/1/schedule', data={'season': '2019-2020', 'teams': '5,5'})
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Invalid payload.', data['message'])
+            response = self.client.post('/divisions/2/schedule', data={'season': '2019-2020', 'teams': '5,12'})
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 404)
+            self.assertIn('Division does not exist', data['message'])
+        self.assertEqual(1, Match.query.count())
+
+    ### bulk loading ###
+    # test bulk load csv
+    def test_bulk_load(self):
+        """Ensure csv rows can be bulk loaded into the match table"""
+        add_division('1ste Afdeling')
+        csv_file = io.StringIO(
+            'division_id,matchweek,date,time,home_team_id,away_team_id,goals_home_team,goals_away_team,status\n'
+            '1,1,2018-09-05,14:30:00,33,67,0,0,NULL\n'
+            '1,1,2018-09-05,15:00:00,17,52,NULL,NULL,NULL\n')
+        self.assertEqual(2, bulk_load(Match.__table__, csv_file, null='NULL'))
+        db.session.commit()
+        matches = Match.query.order_by(Match.id).all()
+        self.assertEqual(2, len(matches))
+        self.assertEqual(datetime.date(2018, 9, 5), matches[0].date)
+        self.assertEqual(datetime.time(15, 0), matches[1].time)
+        self.assertEqual(None, matches[1].goals_home_team)
+        self.assertEqual(2018, matches[0].season)
+
+    # test bulk load csv with wrong columns
+    def test_bulk_load_invalid_columns(self):
+        """Ensure error is thrown if the csv columns do not match the table"""
+        csv_file = io.StringIO('division_id,week\n1,1\n')
+        with self.assertRaises(ValueError):
+            bulk_load(Match.__table__, csv_file)
+
+    ### season partitions ###
+    # test season of a match
+    def test_match_season(self):
+        """Ensure the season of a match follows its date, also for inserts that leave it out"""
+        add_division('1ste Afdeling')
+        match = add_match(1, 1, datetime.date(2019, 8, 31), datetime.time(14, 30), 1, 2, None, None, None)
+        add_match(1, 1, datetime.date(2019, 9, 1), datetime.time(14, 30), 1, 2, None, None, None)
+        self.assertEqual(2018, match.season)
+        match.date = datetime.date(2020, 1, 4)
+        db.session.commit()
+        self.assertEqual(2019, match.season)
+        db.session.bulk_insert_mappings(Match, [{'division_id': 1, 'matchweek': 2, 'date': datetime.date(2020, 9, 5),
+                                                 'time': datetime.time(14, 30), 'home_team_id': 2,
+                                                 'away_team_id': 1}])
+        db.session.commit()
+        self.assertEqual([2019, 2019, 2020], [season for season, in db.session.query(Match.season).order_by(Match.id)])
+        with self.client:
+            response = self.client.get('/matches?season=2019-2020&fields=id,season')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([{'id': 1, 'season': 2019}, {'id': 2, 'season': 2019}], data['data']['matches'])
+
+    # test partitioned table definition
+    def test_match_partitioned_ddl(self):
+        """Ensure postgres partitions the match table by season"""
+        ddl = str(CreateTable(Match.__table__).compile(dialect=postgresql.dialect()))
+        self.assertIn('PRIMARY KEY (id, season)', ddl)
+        self.assertTrue(ddl.rstrip().endswith('PARTITION BY LIST (season)'))
+        self.assertNotIn('PARTITION', str(CreateTable(Division.__table__).compile(dialect=postgresql.dialect())))
+
+    # test migration of a table without seasons
+    def test_migrate_to_partitions(self):
+        """Ensure the migration computes the season of the existing rows"""
+        table = db.Table('legacy_match', db.MetaData(), db.Column('id', db.Integer, primary_key=True),
+                         db.Column('date', db.Date, nullable=False), db.Column('season', db.Integer, nullable=False),
+                         info=partitioned('season'))
+        connection = db.session.connection()
+        connection.execute('CREATE TABLE legacy_match (id INTEGER PRIMARY KEY, date DATE NOT NULL)')
+        try:
+            connection.execute("INSERT INTO legacy_match (id, date) VALUES (1, '2018-09-01'), (2, '2019-08-31'), "
+                               "(3, '2019-09-01')")
+            seasons = migrate_to_partitions(connection, table, season_expression(column('date')))
+            self.assertEqual([(1, 2018), (2, 2018), (3, 2019)],
+                             list(connection.execute('SELECT id, season FROM legacy_match ORDER BY id')))
+            if connection.dialect.name == 'postgresql':
+                self.assertEqual([2018, 2019], seasons)
+                self.assertEqual(['legacy_match_2018', 'legacy_match_2019', 'legacy_match_default'],
+                                 partitions(connection, table))
+            with self.assertRaises(ValueError):
+                migrate_to_partitions(connection, table, season_expression(column('date')))
+        finally:
+            connection.execute('DROP TABLE legacy_match')
+            db.session.commit()
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,11 +1,12 @@
 # services/users/manage.py
 
 import unittest
-import csv
 
+import click
 from flask.cli import FlaskGroup
 
 from project import create_app, db
+from project.api.bulk import bulk_load_file
 from project.api.models import Club, Team
 
 app = create_app()
@@ -32,31 +33,27 @@ def seed_db():
     teams = "./data/teams.csv"
     clubs = "./data/clubs.csv"
 
-    # read from csv
-    with open(clubs) as fp:
-        reader = csv.reader(fp, delimiter=",")
-        next(reader, None)  # skip headers
-        for row in reader:
-            stamNumber = int(row[0])
-            name = row[1]
-            address = row[2]
-            zipCode = int(row[3])
-            city = row[4]
-            website = row[5] if row[5] != '' else None
-            db.session.add(Club(stamNumber=stamNumber, name=name, address=address,
-                                zipCode=zipCode, city=city, website=website))
+    # bulk load from csv
+    bulk_load_file(Club.__table__, clubs, columns=['stamNumber', 'name', 'address', 'zipCode', 'city', 'website'])
+    bulk_load_file(Team.__table__, teams, columns=['id', 'stamNumber', 'suffix', 'color'])
     db.session.commit()
 
-    # read from csv
-    with open(teams) as fp:
-        reader = csv.reader(fp, delimiter=",")
-        next(reader, None)  # skip headers
-        for row in reader:
-            stamNumber = int(row[1])
-            suffix = row[2] if row[2] != '' else None
-            color = row[3]
-            db.session.add(Team(stamNumber=stamNumber, suffix=suffix, color=color))
+
+@cli.command('bulk-import')
+@click.argument('file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--table', required=True, help='Table to load the rows into.')
+@click.option('--columns', default=None, help='Comma separated table columns in csv order, defaults to the header.')
+@click.option('--null', default='', help='Value that stands for NULL in the csv file.')
+def bulk_import(file, table, columns, null):
+    """Loads a csv file into a table in one transaction."""
+    if table not in db.metadata.tables:
+        raise click.BadParameter(f'unknown table {table}', param_hint='--table')
+    try:
+        count = bulk_load_file(db.metadata.tables[table], file, columns.split(',') if columns else None, null)
+    except ValueError as e:
+        raise click.UsageError(str(e))
     db.session.commit()
+    click.echo(f'Imported {count} rows into {table}')
 
 if __name__ == '__main__':
     cli()
@@ -15,6 +15,16 @@ class Club(db.Model):
     website = db.Column(db.String(128), nullable=True)
     teams = db.relationship("Team", back_populates="club", cascade="all, delete", passive_deletes=True)
 
+    # json key -> column attribute, used for ?fields= projections
+    JSON_FIELDS = {
+        'stamnumber': 'stamNumber',
+        'name': 'name',
+        'address': 'address',
+        'zipcode': 'zipCode',
+        'city': 'city',
+        'website': 'website'
+    }
+
     def __init__(self, stamNumber, name, address, zipCode, city, website):
         self.stamNumber = stamNumber
         self.name = name
@@ -42,6 +52,14 @@ class Team(db.Model):
     color = db.Column(db.String(128), nullable=False)
     club = db.relationship("Club", back_populates="teams")
 
+    # json key -> column attribute, used for ?fields= projections
+    JSON_FIELDS = {
+        'id': 'id',
+        'stamnumber': 'stamNumber',
+        'suffix': 'suffix',
+        'color': 'color'
+    }
+
     def __init__(self, stamNumber, suffix, color):
         self.stamNumber = stamNumber
         self.suffix = suffix
@@ -4,7 +4,10 @@
 from flask import Blueprint, jsonify, request, render_template
 from sqlalchemy import exc
 
+from project.api.batch import BatchItemError, delete_returning, from_json, parse_operations, run_batch
 from project.api.models import Team, Club
+from project.api.utils import list_response
+from project.api.versions import versioned
 from project import db
 
 teams_blueprint = Blueprint('teams', __name__)
@@ -49,6 +52,7 @@ def add_team():
 
 # get single team (by ID)
 @teams_blueprint.route('/teams/<team_id>', methods=['GET'])
+@versioned('teams')
 def get_single_team(team_id):
     """Get single team details"""
     response_object = {
@@ -75,12 +79,39 @@ def get_single_team(team_id):
 
 # get all teams
 @teams_blueprint.route('/teams', methods=['GET'])
+@versioned('teams')
 def get_all_teams():
     """Get all teams"""
+    return list_response(Team.query, Team.id, 'teams')
+
+
+def team_name(club_name, suffix):
+    """Display name of a team, the name of its club followed by the suffix of the team if it has one"""
+    return f'{club_name} {suffix}' if suffix else club_name
+
+
+# get team names
+@teams_blueprint.route('/teams/names', methods=['GET'])
+@versioned('teams', 'club')
+def get_team_names():
+    """Display names of the teams in ?ids=1,2,3 (all teams without ids), looked up in one query"""
+    response_object = {
+        'status': 'fail',
+        'message': 'Invalid ids.'
+    }
+    query = db.session.query(Team.id, Club.name, Team.suffix).join(Club, Team.stamNumber == Club.stamNumber)
+    ids = request.args.get('ids')
+    if ids is not None:
+        try:
+            ids = {int(team_id) for team_id in ids.split(',') if team_id}
+        except ValueError:
+            return jsonify(response_object), 400
+        query = query.filter(Team.id.in_(ids))
     response_object = {
         'status': 'success',
         'data': {
-            'teams': [team.to_json() for team in Team.query.all()]
+            'teams': [{'id': team_id, 'name': team_name(club_name, suffix), 'club': club_name}
+                      for team_id, club_name, suffix in query.order_by(Team.id)]
         }
     }
     return jsonify(response_object), 200
@@ -134,11 +165,9 @@ def delete_team(team_id):
         'message': 'Team does not exist'
     }
     try:
-        team = Team.query.filter_by(id=int(team_id)).first()
-        if not team:
+        if not Team.query.filter_by(id=int(team_id)).delete():
             return jsonify(response_object), 404
         else:
-            Team.query.filter_by(id=int(team_id)).delete()
             db.session.commit()
             response_object = {
                 'status': 'success',
@@ -153,6 +182,36 @@ def delete_team(team_id):
         return jsonify(response_object), 400
 
 
+# batch
+@teams_blueprint.route('/teams/batch', methods=['POST'])
+def batch_teams():
+    """Create, update and delete teams in one transaction, see project.api.batch"""
+    try:
+        operations = parse_operations(request.get_json(silent=True))
+    except ValueError:
+        response_object = {
+            'status': 'fail',
+            'message': 'Invalid payload.'
+        }
+        return jsonify(response_object), 400
+
+    def create(data):
+        team = Team(**from_json(Team, data, exclude=('id',)))
+        db.session.add(team)
+        return team
+
+    def update(team_id, data):
+        team = Team.query.get(team_id)
+        if not team:
+            raise BatchItemError('Team does not exist')
+        for attribute, value in from_json(Team, data, exclude=('id',)).items():
+            setattr(team, attribute, value)
+
+    def delete(team_ids):
+        return {team_id for team_id, in delete_returning(Team, team_ids)}
+
+    return run_batch(operations, create, update, delete)
+
 
 ### CLUBS ###
 # ping
@@ -193,6 +252,7 @@ def add_club():
 
 # Read single club (by ID)
 @teams_blueprint.route('/clubs/<club_id>', methods=['GET'])
+@versioned('club')
 def get_single_club(club_id):
     """Get single club details"""
     response_object = {
@@ -221,15 +281,10 @@ def get_single_club(club_id):
 
 # Read all clubs
 @teams_blueprint.route('/clubs', methods=['GET'])
+@versioned('club')
 def get_all_clubs():
     """Get all clubs"""
-    response_object = {
-        'status': 'success',
-        'data': {
-            'clubs': [club.to_json() for club in Club.query.all()]
-        }
-    }
-    return jsonify(response_object), 200
+    return list_response(Club.query, Club.stamNumber, 'clubs')
 
 # update club
 @teams_blueprint.route('/clubs/<club_id>', methods=['PUT'])
@@ -276,11 +331,9 @@ def delete_club(club_id):
         'message': 'Club does not exist'
     }
     try:
-        club = Club.query.filter_by(stamNumber=int(club_id)).first()
-        if not club:
+        if not Club.query.filter_by(stamNumber=int(club_id)).delete():
             return jsonify(response_object), 404
         else:
-            Club.query.filter_by(stamNumber=int(club_id)).delete()
             db.session.commit()
             response_object = {
                 'status': 'success',
@@ -294,3 +347,33 @@ def delete_club(club_id):
         response_object['message'] = 'Failed to delete club'
         return jsonify(response_object), 400
 
+
+# batch
+@teams_blueprint.route('/clubs/batch', methods=['POST'])
+def batch_clubs():
+    """Create, update and delete clubs in one transaction, see project.api.batch"""
+    try:
+        operations = parse_operations(request.get_json(silent=True))
+    except ValueError:
+        response_object = {
+            'status': 'fail',
+            'message': 'Invalid payload.'
+        }
+        return jsonify(response_object), 400
+
+    def create(data):
+        club = Club(**from_json(Club, data))
+        db.session.add(club)
+        return club
+
+    def update(club_id, data):
+        club = Club.query.get(club_id)
+        if not club:
+            raise BatchItemError('Club does not exist')
+        for attribute, value in from_json(Club, data, exclude=('stamnumber',)).items():
+            setattr(club, attribute, value)
+
+    def delete(club_ids):
+        return {club_id for club_id, in delete_returning(Club, club_ids)}
+
+    return run_batch(operations, create, update, delete)
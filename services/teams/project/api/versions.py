@@ -0,0 +1,140 @@
+# services/teams/project/api/versions.py
+# per table version counters, bumped by every transaction that writes and used as ETag of the read endpoints
+
+import functools
+
+from flask import current_app, make_response, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+from sqlalchemy.sql.dml import Delete, UpdateBase
+
+from project import db
+
+WRITTEN_KEY = 'versions_written'  # tables written in the current transaction of a connection
+
+
+class TableVersion(db.Model):
+    __tablename__ = 'table_version'
+
+    table_name = db.Column(db.String(128), primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+
+    def __init__(self, table_name, version=0):
+        self.table_name = table_name
+        self.version = version
+
+
+@event.listens_for(TableVersion.__table__, 'after_create')
+def create_versions(target, connection, **kw):
+    """Start every table of the service at version 0"""
+    connection.execute(target.insert(), [{'table_name': name, 'version': 0}
+                                         for name in db.metadata.tables if name != target.name])
+
+
+def bump_version(connection, table_name):
+    """Increase the version of a table, in the transaction of the connection"""
+    table = TableVersion.__table__
+    result = connection.execute(table.update().where(table.c.table_name == table_name).values(
+        version=table.c.version + 1))
+    if not result.rowcount:
+        connection.execute(table.insert().values(table_name=table_name, version=1))
+
+
+def mark_written(connection, *table_names):
+    """
+    Remember the tables written in the transaction of the connection, their versions are bumped when it commits
+    Outside of a transaction the statement was autocommitted already, the versions are bumped right away in a
+    transaction of their own
+    """
+    table_names = set(table_names) - {TableVersion.__tablename__}
+    if not connection.closed and connection.in_transaction():
+        connection.info.setdefault(WRITTEN_KEY, set()).update(table_names)
+    elif table_names:
+        with connection.engine.begin() as own_connection:
+            for table_name in sorted(table_names):
+                bump_version(own_connection, table_name)
+
+
+@functools.lru_cache(maxsize=None)
+def dependent_tables(table):
+    """
+    Tables the database writes to itself when rows of table are deleted: their foreign keys to it have
+    ON DELETE CASCADE or SET NULL, cascades are followed to the tables depending on the deleted rows in turn
+    """
+    dependents = set()
+    referenced = [table]
+    while referenced:
+        parent = referenced.pop()
+        for child in table.metadata.tables.values():
+            for foreign_key in child.foreign_keys:
+                if foreign_key.ondelete is None or not foreign_key.references(parent) or child.name in dependents:
+                    continue
+                dependents.add(child.name)
+                if foreign_key.ondelete.upper() == 'CASCADE':
+                    referenced.append(child)
+    dependents.discard(table.name)
+    return frozenset(dependents)
+
+
+@event.listens_for(Engine, 'after_execute')
+def track_writes(connection, clauseelement, multiparams, params, result):
+    """Mark every table written to, covers ORM flushes as well as bulk statements"""
+    if isinstance(clauseelement, UpdateBase):
+        mark_written(connection, clauseelement.table.name)
+        if isinstance(clauseelement, Delete):
+            # rows changed by the database itself through the foreign keys
+            mark_written(connection, *dependent_tables(clauseelement.table))
+
+
+@event.listens_for(Engine, 'commit')
+def bump_written(connection):
+    """
+    Bump the versions of the written tables right before the transaction commits, so the version rows are
+    only locked for the commit itself, and always in the same order so concurrent commits can not deadlock
+    """
+    for table_name in sorted(connection.info.pop(WRITTEN_KEY, ())):
+        bump_version(connection, table_name)
+
+
+@event.listens_for(Engine, 'rollback')
+def reset_written(connection):
+    # a rolled back savepoint keeps the tables, bumping a version too often only costs a revalidation
+    connection.info.pop(WRITTEN_KEY, None)
+
+
+@event.listens_for(Pool, 'checkin')
+def reset_written_on_checkin(dbapi_connection, connection_record):
+    if connection_record is not None:
+        connection_record.info.pop(WRITTEN_KEY, None)
+
+
+def table_etag(*table_names):
+    """Strong ETag built from the current versions of the given tables"""
+    versions = dict(db.session.query(TableVersion.table_name, TableVersion.version).filter(
+        TableVersion.table_name.in_(table_names)))
+    return '-'.join(f'{name}.{versions.get(name, 0)}' for name in table_names)
+
+
+def versioned(*table_names):
+    """
+    Decorator for read endpoints whose response only depends on the given tables: sends the table versions
+    as ETag and answers 304 Not Modified when the client already has them (If-None-Match)
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            # json and ndjson are different representations of the same url
+            etag = table_etag(*table_names) + '-' + request.accept_mimetypes.best_match(
+                ['application/json', 'application/x-ndjson'], 'application/json').split('/')[1]
+            if request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.vary.add('Accept')
+            return response
+        return wrapper
+    return decorator
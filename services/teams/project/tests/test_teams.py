@@ -1,10 +1,13 @@
 # services/teams/project/tests/test_teams.py
 
 import json
+import os
+import tempfile
 import unittest
 
 from project import db
 from project.api.models import Team, Club
+from project.api.routing import primary
 from project.tests.base import BaseTestCase
 
 def add_club(stamNumber, name, address, zipcode, city, website):
@@ -34,6 +37,12 @@ class TestTeamsService(BaseTestCase):
         self.assertIn('pong!', data['message'])
         self.assertIn('success', data['status'])
 
+    def test_metrics(self):
+        """Ensure the pool metrics are served in the prometheus text format"""
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('# pool class', response.data.decode())
+
     def test_add_team(self):
         """Ensure a new team can be added to the database"""
         add_club(13, 'WINAK', 'winakstraat 500', 2610, 'Wilrijk', 'www.winak.be')
@@ -124,6 +133,34 @@ class TestTeamsService(BaseTestCase):
             self.assertIn('Team does not exist', data['message'])
             self.assertIn('fail', data['status'])
 
+    def test_team_names(self):
+        """Ensure the names of several teams are resolved in one call"""
+        add_club(13, 'WINAK', 'winakstraat 500', 2610, 'Wilrijk', 'www.winak.be')
+        add_club(14, 'test', 'teststraat 500', 1111, 'Mortsel', 'www.test.be')
+        first = add_team(13, None, 'zwart-oranje')
+        second = add_team(13, 'B', 'zwart-oranje')
+        third = add_team(14, None, 'rood')
+        with self.client:
+            response = self.client.get(f'/teams/names?ids={third.id},{first.id},{second.id},999')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([{'id': first.id, 'name': 'WINAK', 'club': 'WINAK'},
+                              {'id': second.id, 'name': 'WINAK B', 'club': 'WINAK'},
+                              {'id': third.id, 'name': 'test', 'club': 'test'}], data['data']['teams'])
+            self.assertIn('success', data['status'])
+            response = self.client.get('/teams/names')
+            data = json.loads(response.data.decode())
+            self.assertEqual(3, len(data['data']['teams']))
+
+    def test_team_names_invalid_ids(self):
+        """Ensure error is thrown if the ids are not numbers"""
+        with self.client:
+            response = self.client.get('/teams/names?ids=1,blah')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Invalid ids.', data['message'])
+            self.assertIn('fail', data['status'])
+
     def test_single_team_incorrect_id(self):
         """Ensure error is thrown if the id does not exist."""
         with self.client:
@@ -153,6 +190,23 @@ class TestTeamsService(BaseTestCase):
             self.assertIn('geel', data['data']['teams'][1]['color'])
             self.assertIn('success', data['status'])
 
+    def test_all_teams_paginated(self):
+        """Ensure the team list can be paged with a cursor"""
+        add_club(13, 'WINAK', 'winakstraat 500', 2610, 'Wilrijk', 'www.winak.be')
+        add_team(13, None, 'zwart-oranje')
+        add_team(13, 'B', 'geel')
+        with self.client:
+            response = self.client.get('/teams?limit=1')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(data['data']['teams']), 1)
+            self.assertIn('zwart-oranje', data['data']['teams'][0]['color'])
+            response = self.client.get(f"/teams?limit=1&after={data['data']['next']}")
+            data = json.loads(response.data.decode())
+            self.assertEqual(len(data['data']['teams']), 1)
+            self.assertIn('geel', data['data']['teams'][0]['color'])
+            self.assertIn('success', data['status'])
+
     def test_delete_team(self):
         """Ensure a team is deleted when invoking the delete team function"""
         add_club(13, 'WINAK', 'winakstraat 500', 2610, 'Wilrijk', 'www.winak.be')
@@ -375,6 +429,84 @@ class TestTeamsService(BaseTestCase):
             self.assertIn('www.test.be', data['data']['clubs'][1]['website'])
             self.assertIn('success', data['status'])
 
+    def test_read_replica(self):
+        """Ensure list requests read from the replica, and from the primary right after a write"""
+        binds = self.app.config['SQLALCHEMY_BINDS']
+        self.app.config['SQLALCHEMY_BINDS'] = {'replica0': os.environ.get(
+            'DATABASE_REPLICA_TEST_URL', 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'teams_replica.db'))}
+        replica = db.get_engine(self.app, bind='replica0')
+        db.Model.metadata.create_all(bind=replica)
+        try:
+            # flask_testing runs the test in a GET request context
+            with primary(db.session):
+                club_id = add_club(13, 'WINAK', 'winakstraat 500', 2610, 'Wilrijk', 'www.winak.be').stamNumber
+                add_club(14, 'test', 'teststraat 500', 1111, 'Mortsel', 'www.test.be')
+            with self.client:
+                response = self.client.get('/clubs')
+                data = json.loads(response.data.decode())
+                self.assertEqual(len(data['data']['clubs']), 0)
+                response = self.client.delete(f'/clubs/{club_id}')
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('read_primary=1', response.headers['Set-Cookie'])
+                response = self.client.get('/clubs')
+                data = json.loads(response.data.decode())
+                self.assertEqual(len(data['data']['clubs']), 1)
+        finally:
+            db.session.remove()
+            db.Model.metadata.drop_all(bind=replica)
+            replica.dispose()
+            self.app.config['SQLALCHEMY_BINDS'] = binds
+
+    def test_all_clubs_ndjson(self):
+        """Ensure the club list can be streamed as newline delimited json"""
+        add_club(13, 'WINAK', 'winakstraat 500', 2610, 'Wilrijk', 'www.winak.be')
+        add_club(14, 'test', 'teststraat 500', 1111, 'Mortsel', 'www.test.be')
+        with self.client:
+            response = self.client.get('/clubs?after=13', headers={'Accept': 'application/x-ndjson'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, 'application/x-ndjson')
+            clubs = [json.loads(line) for line in response.data.decode().splitlines()]
+            self.assertEqual(len(clubs), 1)
+            self.assertEqual(14, clubs[0]['stamnumber'])
+
+    def test_all_clubs_fields(self):
+        """Ensure the club list only returns the requested fields"""
+        add_club(13, 'WINAK', 'winakstraat 500', 2610, 'Wilrijk', 'www.winak.be')
+        add_club(14, 'test', 'teststraat 500', 1111, 'Mortsel', 'www.test.be')
+        with self.client:
+            response = self.client.get('/clubs?fields=name')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([{'name': 'WINAK'}, {'name': 'test'}], data['data']['clubs'])
+            self.assertIn('success', data['status'])
+
+    def test_all_clubs_etag(self):
+        """Ensure the club list answers 304 while the club table is unchanged"""
+        add_club(13, 'WINAK', 'winakstraat 500', 2610, 'Wilrijk', 'www.winak.be')
+        with self.client:
+            response = self.client.get('/clubs')
+            etag = response.headers['ETag']
+            response = self.client.get('/clubs', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+            add_club(14, 'test', 'teststraat 500', 1111, 'Mortsel', 'www.test.be')
+            response = self.client.get('/clubs', headers={'If-None-Match': etag})
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(data['data']['clubs']), 2)
+
+    def test_single_team_etag_club_deleted(self):
+        """Ensure the ETag of a team changes when the database deletes it together with its club"""
+        add_club(13, 'WINAK', 'winakstraat 500', 2610, 'Wilrijk', 'www.winak.be')
+        team = add_team(13, 'A', 'red')
+        with self.client:
+            response = self.client.get(f'/teams/{team.id}')
+            etag = response.headers['ETag']
+            response = self.client.delete('/clubs/13')
+            self.assertEqual(response.status_code, 200)
+            response = self.client.get(f'/teams/{team.id}', headers={'If-None-Match': etag})
+            self.assertNotEqual(response.status_code, 304)
+            self.assertNotEqual(etag, response.headers.get('ETag'))
+
     def test_delete_club(self):
         """Ensure a team is deleted when invoking the delete team function"""
         club = add_club(13, 'WINAK', 'winakstraat 500', 2610, 'Wilrijk', 'www.winak.be')
@@ -404,6 +536,35 @@ class TestTeamsService(BaseTestCase):
             self.assertIn('Club does not exist', data['message'])
             self.assertIn('fail', data['status'])
 
+    def test_batch_clubs(self):
+        """Ensure clubs can be created and deleted in one batch"""
+        add_club(13, 'WINAK', 'winakstraat 500', 2610, 'Wilrijk', 'www.winak.be')
+        with self.client:
+            response = self.client.post('/clubs/batch', data=json.dumps([
+                {'op': 'create', 'data': {'stamnumber': 14, 'name': 'test', 'address': 'teststraat 500',
+                                          'zipcode': 1111, 'city': 'Mortsel', 'website': None}},
+                {'op': 'delete', 'id': 13},
+            ]), content_type='application/json')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([14, 13], [result['id'] for result in data['data']['results']])
+        self.assertEqual([14], [club.stamNumber for club in Club.query.all()])
+
+    def test_batch_teams_invalid(self):
+        """Ensure nothing of a team batch is applied if one of its operations fails"""
+        add_club(13, 'WINAK', 'winakstraat 500', 2610, 'Wilrijk', 'www.winak.be')
+        team = add_team(13, 'A', 'blue')
+        with self.client:
+            response = self.client.post('/teams/batch', data=json.dumps([
+                {'op': 'update', 'id': team.id, 'data': {'color': 'red'}},
+                {'op': 'create', 'data': {'stamnumber': 13, 'colour': 'green'}},
+            ]), content_type='application/json')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(['success', 'fail'], [result['status'] for result in data['data']['results']])
+            self.assertIn('Invalid payload.', data['data']['results'][1]['message'])
+        self.assertEqual('blue', Team.query.get(team.id).color)
+
     def test_update_club(self):
         """Ensure a club can be updated in the database"""
         club = add_club(13, 'WINAK', 'winakstraat 500', 2610, 'Wilrijk', 'www.winak.be')
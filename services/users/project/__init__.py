@@ -3,11 +3,12 @@
 import os
 
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
 
+from project.api.routing import RoutingSQLAlchemy
 
-# instantiate the db
-db = SQLAlchemy()
+
+# instantiate the db, GET requests read from the replicas if there are any
+db = RoutingSQLAlchemy()
 
 
 def create_app(script_info=None):
@@ -26,6 +27,14 @@ def create_app(script_info=None):
 	from project.api.users import users_blueprint
 	app.register_blueprint(users_blueprint)
 
+	# read-your-writes after a write request
+	from project.api.routing import init_routing
+	init_routing(app)
+
+	# pool metrics on /metrics
+	from project.api.metrics import init_metrics
+	init_metrics(app)
+
 	# shell context for flask cli
 	@app.shell_context_processor
 	def ctx():
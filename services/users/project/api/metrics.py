@@ -0,0 +1,72 @@
+# services/users/project/api/metrics.py
+# connection pool metrics in the prometheus text format
+
+import threading
+import time
+
+from flask import Blueprint, Response
+from sqlalchemy.pool import QueuePool
+
+from project import db
+
+PROMETHEUS_MIMETYPE = 'text/plain; version=0.0.4'
+
+metrics_blueprint = Blueprint('metrics', __name__)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a free connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _do_get(self):
+        begin = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - begin
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+
+def init_metrics(app):
+    """Time the checkouts of the configured connection pool and serve /metrics"""
+    options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+    if 'pool_size' in options:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(options, poolclass=TimedQueuePool)
+    app.register_blueprint(metrics_blueprint)
+
+
+def metric(name, kind, description, value):
+    return f'# HELP {name} {description}\n# TYPE {name} {kind}\n{name} {value}\n'
+
+
+@metrics_blueprint.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Pool metrics of this worker process"""
+    pool = db.engine.pool
+    lines = [f'# pool class {type(pool).__name__}\n']
+    if isinstance(pool, QueuePool):
+        lines += [
+            metric('db_pool_size', 'gauge', 'Connections the pool keeps open.', pool.size()),
+            metric('db_pool_checked_out', 'gauge', 'Connections in use.', pool.checkedout()),
+            metric('db_pool_checked_in', 'gauge', 'Idle connections in the pool.', pool.checkedin()),
+            metric('db_pool_overflow', 'gauge', 'Connections in use above the pool size.', max(pool.overflow(), 0)),
+        ]
+    if isinstance(pool, TimedQueuePool):
+        with pool._stats_lock:
+            lines += [
+                metric('db_pool_checkouts_total', 'counter', 'Connection checkouts.', pool.checkouts),
+                metric('db_pool_checkout_wait_seconds_total', 'counter', 'Time spent waiting for a connection.',
+                       f'{pool.wait_seconds:.6f}'),
+                metric('db_pool_checkout_wait_seconds_max', 'gauge', 'Longest wait for a connection.',
+                       f'{pool.max_wait_seconds:.6f}'),
+            ]
+    return Response(''.join(lines), mimetype=PROMETHEUS_MIMETYPE)
@@ -16,6 +16,17 @@ class User(db.Model):
     admin = db.Column(db.Boolean(), default=False, nullable=False)
     super_admin = db.Column(db.Boolean(), default=False, nullable=False)
 
+    # json key -> column attribute, used for ?fields= projections
+    JSON_FIELDS = {
+        'id': 'id',
+        'username': 'username',
+        'password': 'password',
+        'email': 'email',
+        'club': 'club',
+        'admin': 'admin',
+        'superadmin': 'super_admin'
+    }
+
     def __init__(self, username, password, email, club, admin, super_admin):
         self.username = username
         self.password = password
@@ -5,6 +5,8 @@ from flask import Blueprint, jsonify, request, render_template
 from sqlalchemy import exc
 
 from project.api.models import User
+from project.api.utils import list_response
+from project.api.versions import versioned
 from project import db
 
 users_blueprint = Blueprint('users', __name__)
@@ -46,6 +48,7 @@ def add_user():
 
 # read user (by ID)
 @users_blueprint.route('/users/<user_id>', methods=['GET'])
+@versioned('users')
 def get_single_user(user_id):
     """Get single user details"""
     response_object = {
@@ -76,15 +79,10 @@ def get_single_user(user_id):
 
 # read all users
 @users_blueprint.route('/users', methods=['GET'])
+@versioned('users')
 def get_all_users():
     """Get all users"""
-    response_object = {
-        'status': 'success',
-        'data': {
-            'users': [user.to_json() for user in User.query.all()]
-        }
-    }
-    return jsonify(response_object), 200
+    return list_response(User.query, User.id, 'users')
 
 
 # update user
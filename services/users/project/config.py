@@ -2,6 +2,34 @@
 
 import os
 
+
+def engine_options(database_uri, pool_size=5, max_overflow=10):
+    """
+    Connection pool settings, the defaults can be overridden per environment with DATABASE_POOL_SIZE,
+    DATABASE_MAX_OVERFLOW, DATABASE_POOL_TIMEOUT, DATABASE_POOL_RECYCLE, DATABASE_POOL_PRE_PING and
+    DATABASE_STATEMENT_TIMEOUT (milliseconds, 0 disables it). Only postgres connections are pooled.
+    """
+    if not database_uri or not database_uri.startswith('postgres'):
+        return {}
+    options = {
+        'pool_size': int(os.environ.get('DATABASE_POOL_SIZE', pool_size)),
+        'max_overflow': int(os.environ.get('DATABASE_MAX_OVERFLOW', max_overflow)),
+        'pool_timeout': int(os.environ.get('DATABASE_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DATABASE_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.environ.get('DATABASE_POOL_PRE_PING', '1') == '1'
+    }
+    statement_timeout = int(os.environ.get('DATABASE_STATEMENT_TIMEOUT', 0))
+    if statement_timeout:
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+    return options
+
+
+def replica_binds(urls):
+    """SQLALCHEMY_BINDS of the read replicas, from a comma separated list of urls"""
+    urls = [url.strip() for url in (urls or '').split(',') if url.strip()]
+    return {f'replica{i}': url for i, url in enumerate(urls)}
+
+
 class BaseConfig:
     """
     Base configuration
@@ -9,16 +37,21 @@ class BaseConfig:
     TESTING = False
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = 'my_precious'
+    # seconds a client reads from the primary after a write, longer than the replication lag
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
 
 class DevelopmentConfig(BaseConfig):
     """
     Development configuration
     """
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    SQLALCHEMY_BINDS = replica_binds(os.environ.get('DATABASE_REPLICA_URLS'))
 
 class TestingConfig(BaseConfig):
     """
     Testing Configuration
     """
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_TEST_URL')
\ No newline at end of file
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_TEST_URL')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI, pool_size=2, max_overflow=5)
@@ -1,10 +1,13 @@
 # services/users/project/tests/test_users.py
 
 import json
+import os
+import tempfile
 import unittest
 
 from project import db
 from project.api.models import User
+from project.api.routing import primary
 from project.tests.base import BaseTestCase
 
 def add_user(username, password, email, club, admin, super_admin):
@@ -36,6 +39,12 @@ class TestUserService(BaseTestCase):
             self.assertIn('michael@mherman.org was added!', data['message'])
             self.assertIn('success', data['status'])
 
+    def test_metrics(self):
+        """Ensure the pool metrics are served in the prometheus text format"""
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('# pool class', response.data.decode())
+
     def test_add_user_invalid_json(self):
         """Ensure error is thrown if the JSON object is empty."""
         with self.client:
@@ -154,6 +163,102 @@ class TestUserService(BaseTestCase):
             self.assertEqual(False, data['data']['users'][1]['superadmin'])
             self.assertIn('success', data['status'])
 
+    def test_read_replica(self):
+        """Ensure list requests read from the replica, and from the primary right after a write"""
+        binds = self.app.config['SQLALCHEMY_BINDS']
+        self.app.config['SQLALCHEMY_BINDS'] = {'replica0': os.environ.get(
+            'DATABASE_REPLICA_TEST_URL', 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'users_replica.db'))}
+        replica = db.get_engine(self.app, bind='replica0')
+        db.Model.metadata.create_all(bind=replica)
+        try:
+            # flask_testing runs the test in a GET request context
+            with primary(db.session):
+                user_id = add_user('michael', 'testpass1', 'michael@mherman.org', None, False, False).id
+                add_user('fletcher', 'testpass2', 'fletcher@notreal.com', None, False, False)
+            with self.client:
+                response = self.client.get('/users')
+                data = json.loads(response.data.decode())
+                self.assertEqual(len(data['data']['users']), 0)
+                response = self.client.delete(f'/users/{user_id}')
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('read_primary=1', response.headers['Set-Cookie'])
+                response = self.client.get('/users')
+                data = json.loads(response.data.decode())
+                self.assertEqual(len(data['data']['users']), 1)
+        finally:
+            db.session.remove()
+            db.Model.metadata.drop_all(bind=replica)
+            replica.dispose()
+            self.app.config['SQLALCHEMY_BINDS'] = binds
+
+    def test_all_users_paginated(self):
+        """Ensure the user list can be paged with a cursor"""
+        add_user('michael', 'testpass1', 'michael@mherman.org', None, False, False)
+        add_user('fletcher', 'testpass2', 'fletcher@notreal.com', None, False, False)
+        add_user('test', 'testpass3', 'test@test.org', None, False, False)
+        with self.client:
+            response = self.client.get('/users?limit=2')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(data['data']['users']), 2)
+            self.assertIn('fletcher', data['data']['users'][1]['username'])
+            response = self.client.get(f"/users?limit=2&after={data['data']['next']}")
+            data = json.loads(response.data.decode())
+            self.assertEqual(len(data['data']['users']), 1)
+            self.assertIn('test', data['data']['users'][0]['username'])
+            self.assertNotIn('next', data['data'])
+            self.assertIn('success', data['status'])
+
+    def test_all_users_ndjson(self):
+        """Ensure the user list can be streamed as newline delimited json"""
+        add_user('michael', 'testpass1', 'michael@mherman.org', None, False, False)
+        add_user('fletcher', 'testpass2', 'fletcher@notreal.com', None, False, False)
+        with self.client:
+            response = self.client.get('/users', headers={'Accept': 'application/x-ndjson'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, 'application/x-ndjson')
+            users = [json.loads(line) for line in response.data.decode().splitlines()]
+            self.assertEqual(len(users), 2)
+            self.assertIn('michael', users[0]['username'])
+            self.assertIn('fletcher', users[1]['username'])
+
+    def test_all_users_fields(self):
+        """Ensure the user list can leave out the password"""
+        add_user('michael', 'testpass1', 'michael@mherman.org', '13', False, False)
+        with self.client:
+            response = self.client.get('/users?fields=id,username,club')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([{'id': 1, 'username': 'michael', 'club': '13'}], data['data']['users'])
+            response = self.client.get('/users?fields=')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Invalid fields.', data['message'])
+
+    def test_all_users_invalid_pagination(self):
+        """Ensure error is thrown if the pagination parameters are invalid"""
+        with self.client:
+            response = self.client.get('/users?limit=0')
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Invalid pagination.', data['message'])
+            self.assertIn('fail', data['status'])
+
+    def test_single_user_etag(self):
+        """Ensure a user answers 304 while the users table is unchanged"""
+        user = add_user('michael', 'testpass1', 'michael@mherman.org', None, False, False)
+        with self.client:
+            response = self.client.get(f'/users/{user.id}')
+            etag = response.headers['ETag']
+            response = self.client.get(f'/users/{user.id}', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+            user.club = '13'
+            db.session.commit()
+            response = self.client.get(f'/users/{user.id}', headers={'If-None-Match': etag})
+            data = json.loads(response.data.decode())
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('13', data['data']['club'])
+
     def test_delete_user(self):
         """Ensure a user is deleted when invoking the delete user function"""
         user = add_user('michael', 'strongpassword', 'michael@mherman.org', None, False, False)